@@ -2,7 +2,7 @@ import json
 import os
 from typing import Dict, Any, List, Optional
 from datetime import datetime, time
-import psycopg2
+from db_pool import get_connection
 from psycopg2.extras import RealDictCursor
 import requests
 
@@ -38,7 +38,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'DATABASE_URL not configured'})
         }
     
-    conn = psycopg2.connect(db_url)
+    conn = get_connection(db_url)
     
     try:
         if method == 'GET':
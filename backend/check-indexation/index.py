@@ -1,6 +1,6 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
 from psycopg2.extras import RealDictCursor
 import urllib.request
 import urllib.parse
@@ -40,7 +40,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'DATABASE_URL not configured'})
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     cutoff_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
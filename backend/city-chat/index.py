@@ -1,7 +1,7 @@
 import json
 import os
 from typing import Dict, Any, List
-import psycopg2
+from db_pool import get_connection
 from psycopg2.extras import RealDictCursor
 import requests
 
@@ -66,7 +66,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Configuration missing'}, ensure_ascii=False)
         }
     
-    conn = psycopg2.connect(db_url)
+    conn = get_connection(db_url)
     
     try:
         try:
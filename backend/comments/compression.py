@@ -0,0 +1,186 @@
+'''
+Content-Encoding negotiation for function responses. The module is copied into
+every function that returns large documents, like db_pool.py.
+
+Usage on a finished response dict:
+    return compress_response(event, {'statusCode': 200, 'headers': {...}, 'body': ..., 'isBase64Encoded': False})
+
+Bodies above COMPRESS_MIN_BYTES are encoded with brotli (when the package is
+installed) or gzip, whichever the client prefers in Accept-Encoding, and
+base64-wrapped because the function gateway only passes binary bodies that way.
+Publicly cacheable documents are compressed once per warm instance and
+memoized by body digest, so repeated listings and feeds skip the encoder.
+'''
+import base64
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESS_CACHE_MAX_ENTRIES', '128'))
+COMPRESS_CACHE_MAX_BYTES = int(os.environ.get('COMPRESS_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/xml', 'application/rss+xml', 'text/')
+
+
+def supported_encodings() -> List[str]:
+    '''Server preference order, used to break ties between equal q-values'''
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    return weights
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    weights = parse_accept_encoding(accept_encoding)
+    best: Optional[str] = None
+    best_q = 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def encode(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressedCache:
+    '''LRU of compressed bodies keyed by (body digest, encoding)'''
+
+    def __init__(self, max_entries: int = COMPRESS_CACHE_MAX_ENTRIES,
+                 max_bytes: int = COMPRESS_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[bytes, str], bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key: Tuple[bytes, str], value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, **self.stats}
+
+
+COMPRESSED_CACHE = CompressedCache()
+
+
+def find_header(headers: Dict[str, Any], name: str) -> Optional[str]:
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+def is_cacheable(headers: Dict[str, Any]) -> bool:
+    cache_control = (find_header(headers, 'Cache-Control') or '').lower()
+    return 'public' in cache_control and 'no-store' not in cache_control
+
+
+def compress_response(event: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Encode the body of a 200 response when the client accepts it and it is
+    worth it. Anything else (errors, empty or binary bodies, small documents)
+    is returned untouched apart from Vary, which shared caches need either way.
+    '''
+    headers = response.setdefault('headers', {})
+    body = response.get('body')
+    content_type = (find_header(headers, 'Content-Type') or '').lower()
+    if (response.get('statusCode') != 200 or response.get('isBase64Encoded')
+            or not isinstance(body, str) or not content_type.startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    headers['Vary'] = 'Accept-Encoding'
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = choose_encoding(find_header(event.get('headers') or {}, 'Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    data = body.encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    cache_key = None
+    compressed = None
+    if is_cacheable(headers):
+        cache_key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+        compressed = COMPRESSED_CACHE.get(cache_key)
+    if compressed is None:
+        compressed = encode(data, encoding)
+        if cache_key is not None:
+            COMPRESSED_CACHE.put(cache_key, compressed)
+
+    # base64 adds a third; skip encoding that would not pay for itself
+    if len(compressed) * 4 // 3 >= len(data):
+        return response
+
+    etag = find_header(headers, 'ETag')
+    if etag and not etag.startswith('W/'):
+        # The encoded bytes differ from the identity representation, so the
+        # validator is weakened the same way nginx does for gzip
+        for key in [k for k in headers if k.lower() == 'etag']:
+            del headers[key]
+        headers['ETag'] = 'W/' + etag
+
+    headers['Content-Encoding'] = encoding
+    response['body'] = base64.b64encode(compressed).decode('ascii')
+    response['isBase64Encoded'] = True
+    return response
@@ -1,6 +1,8 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from fast_json import RowEncoder, dumps
+from compression import compress_response
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 import urllib.request
@@ -41,7 +43,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     try:
         if method == 'GET':
@@ -49,7 +51,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             action = params.get('action')
             news_id = params.get('news_id')
             
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor() as cur:
                 if action == 'list_all':
                     cur.execute('''
                         SELECT c.*, n.title as news_title
@@ -75,17 +77,17 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
                 
-                comments = cur.fetchall()
+                comments = RowEncoder(cur.description).rows(cur.fetchall())
                 
-                return {
+                return compress_response(event, {
                     'statusCode': 200,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps([dict(c) for c in comments], default=str),
+                    'body': dumps(comments),
                     'isBase64Encoded': False
-                }
+                })
         
         elif method == 'POST':
             body = json.loads(event.get('body', '{}'))
@@ -150,7 +152,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps(dict(new_comment), default=str),
+                    'body': dumps(new_comment),
                     'isBase64Encoded': False
                 }
         
@@ -0,0 +1,86 @@
+'''
+JSON encoding for query results without the per-value default= callback.
+Column metadata from cursor.description is read once per result set: only
+the temporal/numeric columns are converted with str(), everything else goes
+to the encoder as is. Output matches json.dumps(..., default=str), except that
+non-ASCII text is written as UTF-8 instead of \\u escapes. orjson is used
+when it is installed.
+'''
+import json
+from typing import Any, Dict, List, Sequence
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# date, time, timestamp, timestamptz, interval, timetz, numeric
+STRINGIFIED_TYPE_CODES = {1082, 1083, 1114, 1184, 1186, 1266, 1700}
+
+
+class RowEncoder:
+    '''Turns tuple rows of one result set into JSON-ready dicts'''
+
+    def __init__(self, description: Sequence[Any]):
+        self.names = [column.name for column in description]
+        self.stringified = [
+            index for index, column in enumerate(description)
+            if column.type_code in STRINGIFIED_TYPE_CODES
+        ]
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def row(self, values: Sequence[Any]) -> Dict[str, Any]:
+        if self.stringified:
+            values = list(values)
+            for index in self.stringified:
+                value = values[index]
+                if value is not None:
+                    values[index] = str(value)
+        return dict(zip(self.names, values))
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        return [self.row(values) for values in rows]
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    # Micro-benchmark on a 1,000-article listing shaped like SELECT * FROM news
+    import timeit
+    from collections import namedtuple
+    from datetime import datetime
+    from decimal import Decimal
+
+    Column = namedtuple('Column', 'name type_code')
+    description = [
+        Column('id', 23), Column('title', 1043), Column('content', 25), Column('excerpt', 25),
+        Column('category', 1043), Column('image_url', 25), Column('author_name', 1043),
+        Column('status', 1043), Column('views', 23), Column('tags', 1015), Column('rating', 1700),
+        Column('published_at', 1114), Column('created_at', 1114), Column('updated_at', 1114)
+    ]
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    rows = [
+        (i, f'Новость дня номер {i}', 'Текст новости о событиях в городе. ' * 80, 'Краткое описание новости',
+         'Город', f'https://cdn.example.com/news/{i}.jpg', 'Редакция', 'published', i * 7,
+         ['город', 'события'], Decimal('4.50'), now, now, now)
+        for i in range(1000)
+    ]
+    dict_rows = [dict(zip((c.name for c in description), row)) for row in rows]
+
+    def baseline():
+        return json.dumps([dict(n) for n in dict_rows], default=str)
+
+    def encoded():
+        return dumps(RowEncoder(description).rows(rows))
+
+    assert json.loads(baseline()) == json.loads(encoded())
+    for label, func in (('json.dumps(default=str)', baseline), ('RowEncoder + dumps', encoded)):
+        best = min(timeit.repeat(func, number=10, repeat=5)) / 10
+        print(f'{label:<26} {best * 1000:7.2f} ms  {len(func().encode("utf-8")) / 1e6:5.2f} MB')
+    print('backend:', 'orjson' if orjson is not None else 'json')
@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from fast_json import RowEncoder, dumps
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 
@@ -39,11 +40,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     try:
         if method == 'GET':
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor() as cur:
                 cur.execute('''
                     SELECT * FROM events 
                     WHERE event_date >= CURRENT_TIMESTAMP
@@ -51,7 +52,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     LIMIT 10
                 ''')
                 
-                events_list = cur.fetchall()
+                events_list = RowEncoder(cur.description).rows(cur.fetchall())
                 
                 return {
                     'statusCode': 200,
@@ -59,7 +60,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps([dict(e) for e in events_list], default=str),
+                    'body': dumps(events_list),
                     'isBase64Encoded': False
                 }
         
@@ -99,7 +100,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps(dict(new_event), default=str),
+                    'body': dumps(new_event),
                     'isBase64Encoded': False
                 }
         
@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from compression import compress_response
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 from datetime import datetime
@@ -52,7 +53,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
     
     try:
-        conn = psycopg2.connect(dsn)
+        conn = get_connection(dsn)
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         # Get all published news
@@ -134,7 +135,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         sitemap_xml = '\n'.join(xml_parts)
         
-        return {
+        return compress_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/xml; charset=utf-8',
@@ -143,7 +144,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             },
             'body': sitemap_xml,
             'isBase64Encoded': False
-        }
+        })
         
     except Exception as e:
         return {
@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from compression import compress_response
 from typing import Dict, Any
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -26,7 +27,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
     
     try:
-        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        conn = get_connection(os.environ['DATABASE_URL'])
         cur = conn.cursor()
         
         if method == 'GET':
@@ -69,7 +70,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             cur.close()
             conn.close()
             
-            return {
+            return compress_response(event, {
                 'statusCode': 200,
                 'headers': {
                     'Content-Type': 'application/json',
@@ -77,7 +78,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 },
                 'body': json.dumps(articles, ensure_ascii=False),
                 'isBase64Encoded': False
-            }
+            })
         
         if method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
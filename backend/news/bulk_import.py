@@ -0,0 +1,199 @@
+'''
+Bulk import/upsert of news from a JSON array or NDJSON (one article per line).
+
+Rows are validated up front, then written with execute_values in chunks of
+IMPORT_CHUNK_SIZE, one transaction per chunk. Rows carrying external_id are
+upserted on it (ux_news_external_id); the rest are plain inserts. If a chunk
+fails as a whole, it is replayed row by row under savepoints so that only
+the offending rows are reported and everything else is still committed.
+
+Counters (views, likes) are only written on insert; an update never resets
+them. published_at is optional: when omitted it defaults to now on insert and
+is left as is on update.
+'''
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import psycopg2
+from psycopg2.extras import execute_values
+
+IMPORT_MAX_ROWS = 5000
+IMPORT_CHUNK_SIZE = 500
+
+REQUIRED_FIELDS = ('title', 'category', 'excerpt')
+# Same defaults as a single POST
+FIELD_DEFAULTS = {
+    'content': '', 'image_url': '', 'video_url': '', 'author_id': 1, 'read_time': '5 мин',
+    'status': 'published', 'tags': [], 'is_svo': False, 'is_showbiz': False, 'keywords': '',
+    'views': 0, 'likes': 0, 'external_id': None
+}
+TEXT_LIMITS = {'title': 500, 'category': 100, 'read_time': 50, 'external_id': 255}
+STRING_FIELDS = ('title', 'category', 'excerpt', 'content', 'image_url', 'video_url', 'read_time', 'keywords', 'external_id')
+BOOLEAN_FIELDS = ('is_svo', 'is_showbiz')
+INTEGER_FIELDS = ('author_id', 'views', 'likes')
+INSERT_ONLY_FIELDS = ('views', 'likes', 'external_id')
+IMPORT_COLUMNS = REQUIRED_FIELDS + tuple(FIELD_DEFAULTS)
+
+
+def parse_payload(raw: str) -> List[Tuple[int, Any]]:
+    '''
+    Split the request body into (row number, parsed value) pairs. A JSON array
+    must parse as a whole; NDJSON lines that fail to parse become row errors
+    (the value is a ValueError) without affecting the other lines.
+    '''
+    text = raw.strip()
+    if text.startswith('['):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            raise ValueError('Invalid JSON array')
+        rows = list(enumerate(items, start=1))
+    else:
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError:
+                rows.append((number, ValueError('Invalid JSON')))
+
+    if not rows:
+        raise ValueError('No rows to import')
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ValueError(f'Too many rows, max {IMPORT_MAX_ROWS}')
+    return rows
+
+
+def validate_row(item: Any, statuses: Tuple[str, ...]) -> Dict[str, Any]:
+    '''Normalize one article, raise ValueError with a message for the report'''
+    if not isinstance(item, dict):
+        raise ValueError('Row must be a JSON object')
+    unknown = [key for key in item if key not in IMPORT_COLUMNS and key != 'published_at']
+    if unknown:
+        raise ValueError(f'Unknown field: {unknown[0]}')
+    for field in REQUIRED_FIELDS:
+        if not item.get(field):
+            raise ValueError(f'Missing required field: {field}')
+
+    row = {**FIELD_DEFAULTS, **{key: value for key, value in item.items() if value is not None}}
+    for field in STRING_FIELDS:
+        if row[field] is not None and not isinstance(row[field], str):
+            raise ValueError(f'{field} must be a string')
+    for field, limit in TEXT_LIMITS.items():
+        if row[field] is not None and len(row[field]) > limit:
+            raise ValueError(f'{field} is longer than {limit} characters')
+    for field in BOOLEAN_FIELDS:
+        if not isinstance(row[field], bool):
+            raise ValueError(f'{field} must be a boolean')
+    for field in INTEGER_FIELDS:
+        if isinstance(row[field], bool) or not isinstance(row[field], int) or row[field] < 0:
+            raise ValueError(f'{field} must be a non-negative integer')
+    if row['status'] not in statuses:
+        raise ValueError(f"status must be one of: {', '.join(statuses)}")
+    if not isinstance(row['tags'], list) or not all(isinstance(tag, str) for tag in row['tags']):
+        raise ValueError('tags must be a list of strings')
+
+    if 'published_at' in row:
+        try:
+            row['published_at'] = datetime.fromisoformat(str(row['published_at']).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('published_at must be an ISO 8601 timestamp')
+    return row
+
+
+def upsert_rows(cur, rows: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    '''
+    One execute_values statement per column set (with or without published_at).
+    Returns {'row', 'id', 'external_id', 'inserted'} per input row.
+    '''
+    results = []
+    for with_published_at in (True, False):
+        group = [(number, row) for number, row in rows if ('published_at' in row) == with_published_at]
+        if not group:
+            continue
+        columns = list(IMPORT_COLUMNS) + (['published_at'] if with_published_at else [])
+        updates = [f'{column} = EXCLUDED.{column}' for column in columns if column not in INSERT_ONLY_FIELDS]
+        updates.append('updated_at = CURRENT_TIMESTAMP')
+        returned = execute_values(cur, f'''
+            INSERT INTO news ({', '.join(columns)})
+            VALUES %s
+            ON CONFLICT (external_id) WHERE external_id IS NOT NULL
+            DO UPDATE SET {', '.join(updates)}
+            RETURNING id, (xmax = 0) AS inserted
+        ''', [tuple(row[column] for column in columns) for _, row in group],
+           page_size=IMPORT_CHUNK_SIZE, fetch=True)
+        # VALUES rows come back from RETURNING in input order
+        for (number, row), (news_id, inserted) in zip(group, returned):
+            results.append({'row': number, 'id': news_id, 'external_id': row['external_id'], 'inserted': inserted})
+    return results
+
+
+def import_news(conn, raw: str, statuses: Tuple[str, ...]) -> Dict[str, Any]:
+    '''Validate, write in chunked transactions and build the per-row report'''
+    errors: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    seen_external_ids: Dict[str, int] = {}
+
+    for number, item in parse_payload(raw):
+        try:
+            if isinstance(item, ValueError):
+                raise item
+            row = validate_row(item, statuses)
+            external_id = row['external_id']
+            if external_id is not None:
+                if external_id in seen_external_ids:
+                    raise ValueError(f'Duplicate external_id, already in row {seen_external_ids[external_id]}')
+                seen_external_ids[external_id] = number
+            valid.append((number, row))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+
+    written: List[Dict[str, Any]] = []
+    published = False
+    for start in range(0, len(valid), IMPORT_CHUNK_SIZE):
+        chunk = valid[start:start + IMPORT_CHUNK_SIZE]
+        try:
+            with conn.cursor() as cur:
+                chunk_results = upsert_rows(cur, chunk)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            chunk_results, chunk_errors = replay_rows(conn, chunk)
+            errors.extend(chunk_errors)
+        written.extend(chunk_results)
+        done = {result['row'] for result in chunk_results}
+        published = published or any(row['status'] == 'published' for number, row in chunk if number in done)
+
+    written.sort(key=lambda result: result['row'])
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'inserted': sum(1 for result in written if result['inserted']),
+        'updated': sum(1 for result in written if not result['inserted']),
+        'failed': len(errors),
+        'published': published,
+        'items': [{key: result[key] for key in ('row', 'id', 'external_id')} for result in written],
+        'errors': errors
+    }
+
+
+def replay_rows(conn, chunk: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    '''Write a failed chunk row by row, isolating database errors with savepoints'''
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    with conn.cursor() as cur:
+        for number, row in chunk:
+            cur.execute('SAVEPOINT import_row')
+            try:
+                results.extend(upsert_rows(cur, [(number, row)]))
+                cur.execute('RELEASE SAVEPOINT import_row')
+            except psycopg2.Error as e:
+                cur.execute('ROLLBACK TO SAVEPOINT import_row')
+                errors.append({'row': number, 'error': first_line(e)})
+    conn.commit()
+    return results, errors
+
+
+def first_line(error: psycopg2.Error) -> str:
+    message: Optional[str] = error.diag.message_primary or str(error)
+    return message.strip().splitlines()[0] if message else error.__class__.__name__
@@ -0,0 +1,171 @@
+'''
+PostgreSQL connection pool that survives between warm invocations of a function.
+The module is copied into every function directory that talks to the database,
+because each function is deployed on its own.
+
+Usage stays the same as with a plain connection:
+    conn = get_connection(dsn)
+    ...
+    conn.close()  # returns the connection to the pool instead of closing it
+'''
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import psycopg2
+import psycopg2.extensions
+
+POOL_MAX_IDLE = int(os.environ.get('DB_POOL_MAX_IDLE', '2'))
+CONN_MAX_LIFETIME = float(os.environ.get('DB_CONN_MAX_LIFETIME', '600'))
+HEALTH_CHECK_AFTER = float(os.environ.get('DB_HEALTH_CHECK_AFTER', '30'))
+CONNECT_RETRIES = 2
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    '''Connection whose close() hands it back to the pool it came from'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool: Optional['ConnectionPool'] = None
+        self.created_at = time.monotonic()
+        self.in_pool = False
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.putconn(self)
+        else:
+            super().close()
+
+    def close_physically(self):
+        psycopg2.extensions.connection.close(self)
+
+
+class ConnectionPool:
+    def __init__(self, dsn: str, max_idle: int = POOL_MAX_IDLE,
+                 max_lifetime: float = CONN_MAX_LIFETIME,
+                 health_check_after: float = HEALTH_CHECK_AFTER):
+        self.dsn = dsn
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self._idle: List[Tuple[PooledConnection, float]] = []
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            'connects': 0,
+            'reuses': 0,
+            'health_checks': 0,
+            'failed_health_checks': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'connect_errors': 0
+        }
+
+    def getconn(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+
+            if self._is_usable(conn, released_at):
+                conn.in_pool = False
+                self.stats['reuses'] += 1
+                return conn
+            self._discard(conn)
+
+        return self._connect()
+
+    def putconn(self, conn: PooledConnection):
+        if conn.in_pool:
+            return
+        if conn.closed:
+            self.stats['discarded'] += 1
+            return
+
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                conn.in_pool = True
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._discard(conn)
+
+    def _connect(self) -> PooledConnection:
+        last_error: Optional[Exception] = None
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                conn = psycopg2.connect(self.dsn, connection_factory=PooledConnection)
+                conn.pool = self
+                self.stats['connects'] += 1
+                return conn
+            except psycopg2.OperationalError as e:
+                self.stats['connect_errors'] += 1
+                last_error = e
+                time.sleep(0.1 * (attempt + 1))
+        raise last_error
+
+    def _is_usable(self, conn: PooledConnection, released_at: float) -> bool:
+        if conn.closed:
+            return False
+
+        now = time.monotonic()
+        if now - conn.created_at > self.max_lifetime:
+            self.stats['recycled'] += 1
+            return False
+
+        if now - released_at > self.health_check_after:
+            self.stats['health_checks'] += 1
+            try:
+                with conn.cursor() as cur:
+                    cur.execute('SELECT 1')
+                conn.rollback()
+            except psycopg2.Error:
+                self.stats['failed_health_checks'] += 1
+                return False
+
+        return True
+
+    def _discard(self, conn: PooledConnection):
+        self.stats['discarded'] += 1
+        conn.in_pool = False
+        try:
+            conn.close_physically()
+        except psycopg2.Error:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            idle = len(self._idle)
+        return {'idle': idle, 'max_idle': self.max_idle, **self.stats}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: str) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = ConnectionPool(dsn)
+            _pools[dsn] = pool
+        return pool
+
+
+def get_connection(dsn: str) -> PooledConnection:
+    '''Drop-in replacement for psycopg2.connect(dsn) backed by the warm pool'''
+    return get_pool(dsn).getconn()
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {'pools': [pool.snapshot() for pool in pools]}
@@ -0,0 +1,154 @@
+'''
+Full-archive export of news as NDJSON or CSV with flat memory use.
+
+Rows are read through a server-side (named) cursor EXPORT_BATCH_SIZE at a
+time and encoded batch by batch, so only one batch is ever held in Python.
+The function gateway cannot stream a response, so over HTTP the archive is
+served in chunks of up to EXPORT_CHUNK_ROWS rows, keyed by id: every chunk
+names the id to continue after. With destination=s3 the whole archive is
+written in one call as an S3 multipart upload to the bucket image-upload
+uses, one part per EXPORT_PART_BYTES of encoded output.
+'''
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+from fast_json import RowEncoder, dumps
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv')
+}
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_CHUNK_MAX = 20000
+# S3 requires at least 5 MB for every part but the last
+EXPORT_PART_BYTES = 8 * 1024 * 1024
+
+
+def iter_batches(conn, columns: Sequence[str], status: Optional[str], after_id: int,
+                 limit: Optional[int]) -> Iterator[Tuple[RowEncoder, List[Tuple]]]:
+    '''Yield (encoder, rows) batches in id order from a named cursor'''
+    conditions = ['n.id > %s']
+    values: List[Any] = [after_id]
+    if status:
+        conditions.append('n.status = %s')
+        values.append(status)
+    query = f'''
+        SELECT {', '.join('a.name as author_name' if c == 'author_name' else f'n.{c}' for c in columns)}
+        FROM news n
+        LEFT JOIN authors a ON n.author_id = a.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY n.id
+    '''
+    if limit is not None:
+        query += f' LIMIT {int(limit)}'
+
+    with conn.cursor(name=f'news_export_{uuid.uuid4().hex[:8]}') as cur:
+        cur.itersize = EXPORT_BATCH_SIZE
+        cur.execute(query, values)
+        encoder = None
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            if encoder is None:
+                encoder = RowEncoder(cur.description)
+            yield encoder, rows
+
+
+def encode_batch(fmt: str, encoder: RowEncoder, rows: List[Tuple], header: bool) -> str:
+    if fmt == 'ndjson':
+        return ''.join(dumps(item) + '\n' for item in encoder.rows(rows))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(encoder.names)
+    for item in encoder.rows(rows):
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+            for value in item.values()
+        ])
+    return buffer.getvalue()
+
+
+def export_chunk(conn, fmt: str, columns: Sequence[str], status: Optional[str],
+                 after_id: int, limit: int) -> Tuple[str, int, Optional[int]]:
+    '''
+    One HTTP-sized chunk after after_id. Returns the body, the row count and
+    the id to continue after (None when the archive is exhausted).
+    '''
+    parts: List[str] = []
+    count = 0
+    last_id = None
+    for encoder, rows in iter_batches(conn, columns, status, after_id, limit):
+        parts.append(encode_batch(fmt, encoder, rows, header=count == 0 and after_id == 0))
+        count += len(rows)
+        last_id = rows[-1][encoder.index('id')]
+    conn.commit()
+    return ''.join(parts), count, last_id if count == limit else None
+
+
+def export_to_s3(conn, fmt: str, columns: Sequence[str], status: Optional[str]) -> Dict[str, Any]:
+    '''Upload the whole archive as one object via multipart upload'''
+    import boto3
+
+    s3_endpoint = os.environ.get('S3_ENDPOINT', 'https://storage.yandexcloud.net')
+    s3_bucket = os.environ.get('S3_BUCKET', 'poehali-storage')
+    s3_client = boto3.client(
+        's3',
+        endpoint_url=s3_endpoint,
+        aws_access_key_id=os.environ.get('S3_ACCESS_KEY'),
+        aws_secret_access_key=os.environ.get('S3_SECRET_KEY'),
+        region_name='ru-central1'
+    )
+    content_type, extension = EXPORT_FORMATS[fmt]
+    key = f"exports/news/{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.{extension}"
+    upload_id = s3_client.create_multipart_upload(Bucket=s3_bucket, Key=key, ContentType=content_type)['UploadId']
+
+    uploaded: List[Dict[str, Any]] = []
+    buffer = io.BytesIO()
+    rows_total = 0
+    bytes_total = 0
+
+    def flush():
+        part = s3_client.upload_part(
+            Bucket=s3_bucket, Key=key, UploadId=upload_id,
+            PartNumber=len(uploaded) + 1, Body=buffer.getvalue()
+        )
+        uploaded.append({'PartNumber': len(uploaded) + 1, 'ETag': part['ETag']})
+        buffer.seek(0)
+        buffer.truncate()
+
+    try:
+        for encoder, rows in iter_batches(conn, columns, status, 0, None):
+            data = encode_batch(fmt, encoder, rows, header=rows_total == 0).encode('utf-8')
+            buffer.write(data)
+            rows_total += len(rows)
+            bytes_total += len(data)
+            if buffer.tell() >= EXPORT_PART_BYTES:
+                flush()
+        conn.commit()
+        if buffer.tell() or not uploaded:
+            flush()
+        s3_client.complete_multipart_upload(
+            Bucket=s3_bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': uploaded}
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=s3_bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return {
+        'key': key,
+        'url': s3_client.generate_presigned_url(
+            'get_object', Params={'Bucket': s3_bucket, 'Key': key}, ExpiresIn=3600
+        ),
+        'rows': rows_total,
+        'bytes': bytes_total,
+        'parts': len(uploaded)
+    }
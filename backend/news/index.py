@@ -1,29 +1,686 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection, pool_stats
+from listing_cache import ListingCache, make_key
+from fast_json import RowEncoder, dumps
+from compression import COMPRESSED_CACHE, compress_response
+from prepared import execute_prepared
+from bulk_import import import_news
+from export import EXPORT_CHUNK_MAX, EXPORT_CHUNK_ROWS, EXPORT_FORMATS, export_chunk, export_to_s3
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+import base64
+import hashlib
+import hmac
 import random
-import urllib.request
-import urllib.error
 
-UPDATE_SITEMAP_URL = 'https://functions.poehali.dev/a3682adf-931b-4c62-8bd9-3f1fc603b95c'
+NEWS_PAGE_SIZE = 20
+NEWS_PAGE_MAX = 100
+# Cap for the legacy (cursor-less) lists, so they stay an index walk too
+NEWS_LIST_MAX = 1000
+BATCH_MAX_IDS = 200
+SYNC_PAGE_SIZE = 500
+SYNC_PAGE_MAX = 1000
+# Rows younger than this may still belong to transactions that have not committed yet
+SYNC_SAFETY_LAG_SECONDS = 2
 
-def trigger_sitemap_regeneration():
-    '''Trigger sitemap update and notify search engines'''
+FEATURED_LOCK_KEY = 7001
+NEWS_STATUSES = ('published', 'draft', 'deleted')
+
+LISTING_CACHE = ListingCache()
+
+NEWS_COLUMNS = (
+    'id', 'title', 'category', 'excerpt', 'content', 'image_url', 'video_url',
+    'author_id', 'read_time', 'status', 'is_featured', 'views', 'likes', 'tags',
+    'is_svo', 'is_showbiz', 'keywords', 'indexed_yandex', 'indexed_google',
+    'last_ping_at', 'ping_count', 'published_at', 'created_at', 'updated_at',
+    'external_id'
+)
+# Every news column except search_vector: the tsvector is only used by the
+# search function and must never leave the database
+NEWS_RETURNING = ', '.join(NEWS_COLUMNS)
+NEWS_SELECT = ', '.join(f'n.{c}' for c in NEWS_COLUMNS) + ', a.name as author_name'
+
+CACHE_CONTROL = {
+    'article': 'public, max-age=60, stale-while-revalidate=600',
+    'feed': 'public, max-age=30, stale-while-revalidate=120',
+    'filtered': 'public, max-age=60, stale-while-revalidate=300',
+    'section': 'public, max-age=120, stale-while-revalidate=900'
+}
+
+FIELD_PROFILES = {
+    'card': ['id', 'title', 'excerpt', 'image_url', 'category', 'published_at',
+             'author_name', 'views', 'likes']
+}
+
+def mark_sitemap_dirty(cur):
+    '''
+    Flag the sitemap as stale inside the caller's transaction. The scheduler
+    rebuilds it at most once per window, however many articles were published.
+    '''
+    cur.execute('''
+        UPDATE sitemap_state
+        SET dirty_since = COALESCE(dirty_since, CURRENT_TIMESTAMP)
+        WHERE id = 1
+    ''')
+
+def bump_news_version(cur):
+    '''Invalidate listing caches of every warm instance, in the caller's transaction'''
+    cur.execute('''
+        UPDATE cache_versions
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE name = 'news'
+    ''')
+
+def get_news_version(cur) -> int:
+    execute_prepared(cur, "SELECT version FROM cache_versions WHERE name = 'news'")
+    row = cur.fetchone()
+    return row['version'] if row else 0
+
+def clear_featured(cur, keep_id: Any = None):
+    '''
+    Unpin the current featured article before pinning another one. Only the
+    previously featured row is touched (via the ux_news_featured partial index);
+    the advisory lock serialises concurrent swaps so the unique index never trips.
+    updated_at moves with the flag so the article's ETag and changed_since see it.
+    '''
+    cur.execute('SELECT pg_advisory_xact_lock(%s)', (FEATURED_LOCK_KEY,))
+    if keep_id is None:
+        cur.execute('UPDATE news SET is_featured = FALSE, updated_at = CURRENT_TIMESTAMP WHERE is_featured = TRUE')
+    else:
+        cur.execute('''
+            UPDATE news SET is_featured = FALSE, updated_at = CURRENT_TIMESTAMP
+            WHERE is_featured = TRUE AND id <> %s
+        ''', (keep_id,))
+
+def encode_cursor(published_at: datetime, news_id: int) -> str:
+    '''Pack the (published_at, id) position of the last row into an opaque token'''
+    raw = json.dumps([published_at.isoformat(), news_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    '''Unpack a token produced by encode_cursor, raise ValueError on garbage'''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, news_id = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+        return datetime.fromisoformat(published_at), int(news_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_limit(limit: Optional[str], default: Optional[int]) -> Optional[int]:
+    if limit is None or limit == '':
+        return default
+    try:
+        value = int(limit)
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if value < 1:
+        raise ValueError('Invalid limit')
+    return value
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    '''Resolve fields= into a column list: a profile name or comma-separated columns'''
+    if not fields:
+        return None
+    if fields in FIELD_PROFILES:
+        return FIELD_PROFILES[fields]
+
+    requested = []
+    for name in fields.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in NEWS_COLUMNS and name != 'author_name':
+            raise ValueError(f'Unknown field: {name}')
+        if name not in requested:
+            requested.append(name)
+    return requested or None
+
+def is_standard_projection(columns: Optional[List[str]]) -> bool:
+    '''
+    All columns or a named profile. Only these queries are prepared: an
+    arbitrary fields= list runs ad hoc, so one-off column combinations never
+    take up the per-connection statement slots.
+    '''
+    return columns is None or columns in FIELD_PROFILES.values()
+
+def build_projection(columns: Optional[List[str]], paginate: bool) -> Tuple[str, bool, List[str]]:
+    '''
+    SELECT list for the requested columns. Returns the SQL fragment, whether
+    the authors join is needed and the helper columns to strip from the output
+    (the cursor always needs id and published_at).
+    '''
+    if columns is None:
+        return NEWS_SELECT, True, []
+
+    selected = list(columns)
+    hidden = []
+    if paginate:
+        for key in ('id', 'published_at'):
+            if key not in selected:
+                selected.append(key)
+                hidden.append(key)
+
+    parts = ['a.name as author_name' if c == 'author_name' else f'n.{c}' for c in selected]
+    return ', '.join(parts), 'author_name' in selected, hidden
+
+# alias -> (FROM clause, ordering columns) of a listing
+LISTING_SOURCES = {
+    'n': ('news n', ('n.published_at', 'n.id')),
+    't': ('news_tags t JOIN news n ON n.id = t.news_id', ('t.published_at', 't.news_id'))
+}
+
+def listing_source(is_svo: bool, is_showbiz: bool, tag: Optional[str], featured: bool = False) -> str:
+    '''
+    Alias of the table a listing walks. A tag feed goes through news_tags:
+    the GIN index on news.tags cannot return rows in (published_at, id) order.
+    '''
+    return 't' if tag and not (featured or is_svo or is_showbiz) else 'n'
+
+def build_news_filter(status: str, is_svo: bool, is_showbiz: bool,
+                      tag: Optional[str], category: Optional[str],
+                      featured: bool = False) -> Tuple[List[str], List[Any]]:
+    '''
+    WHERE conditions shared by the listing queries. Known statuses are inlined
+    as literals so that prepared (generic) plans can still match the partial
+    indexes on status = 'published'. Tag feeds filter news_tags (see
+    listing_source).
+    '''
+    alias = listing_source(is_svo, is_showbiz, tag, featured)
+    if status in NEWS_STATUSES:
+        conditions = [f"{alias}.status = '{status}'"]
+        values: List[Any] = []
+    else:
+        conditions = [f'{alias}.status = %s']
+        values = [status]
+
+    if featured:
+        conditions.append('n.is_featured = TRUE')
+    elif is_svo:
+        conditions.append('n.is_svo = TRUE')
+    elif is_showbiz:
+        conditions.append('n.is_showbiz = TRUE')
+    elif tag:
+        conditions.append('t.tag = %s')
+        values.append(tag)
+    elif category:
+        conditions.append('n.category = %s')
+        values.append(category)
+
+    return conditions, values
+
+def fetch_news_page(cur, status: str, is_svo: bool, is_showbiz: bool,
+                    tag: Optional[str], category: Optional[str],
+                    cursor: Optional[str], limit: Optional[str],
+                    paginate: bool,
+                    columns: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Keyset pagination over (published_at, id) for every listing mode.
+    Without a cursor parameter the legacy behaviour is kept: a plain list
+    (100 rows for the SVO/showbiz feeds, limit= when passed), capped at
+    NEWS_LIST_MAX. columns narrows the SELECT list (see parse_fields), None
+    means everything.
+    '''
+    conditions, values = build_news_filter(status, is_svo, is_showbiz, tag, category)
+    source, (published_at, row_id) = LISTING_SOURCES[listing_source(is_svo, is_showbiz, tag)]
+
+    if paginate:
+        page_size = min(parse_limit(limit, NEWS_PAGE_SIZE), NEWS_PAGE_MAX)
+        if cursor:
+            last_published_at, last_id = decode_cursor(cursor)
+            conditions.append(f'({published_at}, {row_id}) < (%s, %s)')
+            values.extend([last_published_at, last_id])
+    else:
+        page_size = min(parse_limit(limit, 100 if is_svo or is_showbiz else NEWS_LIST_MAX), NEWS_LIST_MAX)
+
+    select_list, join_authors, hidden = build_projection(columns, paginate)
+    join = 'LEFT JOIN authors a ON n.author_id = a.id' if join_authors else ''
+    # One extra row tells us whether another page exists. The limit is a
+    # parameter, so one prepared statement serves every page size.
+    query = f'''
+        SELECT {select_list}
+        FROM {source}
+        {join}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {published_at} DESC, {row_id} DESC
+        LIMIT %s
+    '''
+    values.append(page_size + 1 if paginate else page_size)
+
+    # Plain tuples + precomputed column metadata are cheaper than RealDictRow
+    with cur.connection.cursor() as raw_cur:
+        execute_prepared(raw_cur, query, values, is_standard_projection(columns))
+        rows = raw_cur.fetchall()
+        encoder = RowEncoder(raw_cur.description)
+
+    next_cursor = None
+    if paginate and len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[encoder.index('published_at')], last[encoder.index('id')])
+
+    items = encoder.rows(rows)
+    for item in items:
+        for key in hidden:
+            del item[key]
+
+    return items, next_cursor
+
+def fetch_trending(cur, limit: Optional[str], columns: Optional[List[str]]) -> List[Dict[str, Any]]:
+    '''
+    Top of the news_trending ranking maintained by the scheduler: an index
+    walk over news_trending plus primary key lookups into news.
+    '''
+    page_size = min(parse_limit(limit, NEWS_PAGE_SIZE), NEWS_PAGE_MAX)
+    select_list, join_authors, _ = build_projection(columns, False)
+    join = 'LEFT JOIN authors a ON n.author_id = a.id' if join_authors else ''
+    with cur.connection.cursor() as raw_cur:
+        execute_prepared(raw_cur, f'''
+            SELECT {select_list}
+            FROM news_trending t
+            JOIN news n ON n.id = t.news_id
+            {join}
+            WHERE n.status = 'published'
+            ORDER BY t.score DESC, t.news_id DESC
+            LIMIT %s
+        ''', (page_size,), is_standard_projection(columns))
+        encoder = RowEncoder(raw_cur.description)
+        return encoder.rows(raw_cur.fetchall())
+
+def fetch_related(cur, news_id: int, columns: Optional[List[str]]) -> List[Dict[str, Any]]:
+    '''"Read also" list precomputed by the scheduler into news_related'''
+    select_list, join_authors, _ = build_projection(columns or FIELD_PROFILES['card'], False)
+    join = 'LEFT JOIN authors a ON n.author_id = a.id' if join_authors else ''
+    with cur.connection.cursor() as raw_cur:
+        execute_prepared(raw_cur, f'''
+            SELECT {select_list}
+            FROM news_related r
+            JOIN news n ON n.id = r.related_id
+            {join}
+            WHERE r.news_id = %s AND n.status = 'published'
+            ORDER BY r.rank
+        ''', (news_id,), is_standard_projection(columns))
+        encoder = RowEncoder(raw_cur.description)
+        return encoder.rows(raw_cur.fetchall())
+
+def fetch_facets(cur) -> Dict[str, Any]:
+    '''
+    Sidebar counts of published news from the news_facets summary table, which
+    triggers on news keep current, so the cost is O(number of facets).
+    '''
+    execute_prepared(cur, '''
+        SELECT facet, value, count
+        FROM news_facets
+        WHERE count > 0
+        ORDER BY facet, count DESC, value
+    ''')
+    facets: Dict[str, Any] = {'total': 0, 'categories': [], 'tags': [], 'sections': {'svo': 0, 'showbiz': 0}}
+    for row in cur.fetchall():
+        if row['facet'] == 'all':
+            facets['total'] = row['count']
+        elif row['facet'] == 'category':
+            facets['categories'].append({'name': row['value'], 'count': row['count']})
+        elif row['facet'] == 'tag':
+            facets['tags'].append({'name': row['value'], 'count': row['count']})
+        elif row['facet'] == 'section':
+            facets['sections'][row['value']] = row['count']
+    return facets
+
+def parse_ids(raw: Any) -> List[int]:
+    '''Accept "1,2,3" or a JSON list, keep the first occurrence order'''
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError('Invalid ids')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid ids')
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f'Too many ids, max {BATCH_MAX_IDS}')
+    return ids
+
+def fetch_news_by_ids(cur, ids: List[int], columns: Optional[List[str]]) -> Dict[str, Any]:
+    '''One ANY() query for the whole id list, returned in the requested order'''
+    prepare = is_standard_projection(columns)
+    if columns is not None and 'id' not in columns:
+        columns = ['id'] + columns
+        hidden = ['id']
+    else:
+        hidden = []
+    select_list, join_authors, _ = build_projection(columns, False)
+    join = 'LEFT JOIN authors a ON n.author_id = a.id' if join_authors else ''
+    with cur.connection.cursor() as raw_cur:
+        execute_prepared(raw_cur, f'''
+            SELECT {select_list}
+            FROM news n
+            {join}
+            WHERE n.id = ANY(%s)
+        ''', (ids,), prepare)
+        encoder = RowEncoder(raw_cur.description)
+        found = {row['id']: row for row in encoder.rows(raw_cur.fetchall())}
+
+    items = [found[news_id] for news_id in ids if news_id in found]
+    merge_pending_counters(cur, items)
+    for item in items:
+        for key in hidden:
+            del item[key]
+
+    return {
+        'items': items,
+        'missing': [news_id for news_id in ids if news_id not in found]
+    }
+
+def batch_response(cur, raw_ids: Any, fields: Optional[str]) -> Dict[str, Any]:
+    try:
+        result = fetch_news_by_ids(cur, parse_ids(raw_ids), parse_fields(fields))
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)}),
+            'isBase64Encoded': False
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': dumps(result),
+        'isBase64Encoded': False
+    }
+
+def parse_sync_position(raw: str) -> Tuple[datetime, Optional[int]]:
+    '''changed_since is either an ISO timestamp or a high_water_mark token'''
     try:
-        req = urllib.request.Request(UPDATE_SITEMAP_URL, method='GET')
-        with urllib.request.urlopen(req, timeout=15) as response:
-            if response.status == 200:
-                result = json.loads(response.read().decode('utf-8'))
-                print(f"Sitemap updated and search engines notified: {result.get('ping_results', {})}")
-    except Exception as e:
-        print(f"Failed to update sitemap: {str(e)}")
+        since = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        return decode_cursor(raw)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since, None
+
+def fetch_news_changes(cur, changed_since: str, limit: Optional[str],
+                       columns: Optional[List[str]]) -> Dict[str, Any]:
+    '''
+    Rows whose updated_at moved past the client's position, oldest first.
+    Published rows come back as items, anything else (soft-deleted, unpublished)
+    as a tombstone. high_water_mark is the token to pass as changed_since next time.
+    '''
+    since, since_id = parse_sync_position(changed_since)
+    page_size = min(parse_limit(limit, SYNC_PAGE_SIZE), SYNC_PAGE_MAX)
+
+    if since_id is None:
+        position = 'n.updated_at > %s'
+        values: List[Any] = [since]
+    else:
+        position = '(n.updated_at, n.id) > (%s, %s)'
+        values = [since, since_id]
+
+    selected = list(columns) if columns is not None else None
+    hidden = []
+    if selected is not None:
+        for key in ('id', 'updated_at', 'status'):
+            if key not in selected:
+                selected.append(key)
+                hidden.append(key)
+    select_list, join_authors, _ = build_projection(selected, False)
+    join = 'LEFT JOIN authors a ON n.author_id = a.id' if join_authors else ''
+
+    cur.execute(f'''
+        SELECT {select_list}
+        FROM news n
+        {join}
+        WHERE {position}
+          AND n.updated_at <= CURRENT_TIMESTAMP - make_interval(secs => %s)
+        ORDER BY n.updated_at, n.id
+        LIMIT %s
+    ''', values + [SYNC_SAFETY_LAG_SECONDS, page_size + 1])
+    rows = [dict(row) for row in cur.fetchall()]
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if rows:
+        high_water_mark = encode_cursor(rows[-1]['updated_at'], rows[-1]['id'])
+    else:
+        high_water_mark = encode_cursor(since, since_id) if since_id is not None else changed_since
+
+    items = [row for row in rows if row['status'] == 'published']
+    deleted = [
+        {'id': row['id'], 'status': row['status'], 'updated_at': row['updated_at']}
+        for row in rows if row['status'] != 'published'
+    ]
+
+    merge_pending_counters(cur, items)
+    for item in items:
+        for key in hidden:
+            del item[key]
+
+    return {
+        'items': items,
+        'deleted': deleted,
+        'high_water_mark': high_water_mark,
+        'has_more': has_more
+    }
+
+def make_etag(*parts: Any) -> str:
+    return '"' + hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest() + '"'
+
+def http_date(value: datetime) -> str:
+    return formatdate(value.replace(tzinfo=timezone.utc).timestamp(), usegmt=True)
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def is_admin(event: Dict[str, Any]) -> bool:
+    '''X-Admin-Token matches the ADMIN_TOKEN secret; with no secret set nobody is admin'''
+    expected = os.environ.get('ADMIN_TOKEN', '')
+    supplied = get_header(event, 'X-Admin-Token') or ''
+    return bool(expected) and hmac.compare_digest(supplied.encode('utf-8'), expected.encode('utf-8'))
+
+def is_not_modified(event: Dict[str, Any], etag: str, last_modified: Optional[datetime] = None) -> bool:
+    '''If-None-Match wins over If-Modified-Since, as RFC 9110 requires'''
+    if_none_match = get_header(event, 'If-None-Match')
+    if if_none_match:
+        # Weak comparison: compressed responses carry the W/ form of the same tag
+        candidates = [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+
+    if_modified_since = get_header(event, 'If-Modified-Since')
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+    return False
+
+def cache_control_for(params: Dict[str, Any], status: str) -> str:
+    '''Freshness per listing type: sections change rarely, the main feed often'''
+    if params.get('facets', 'false').lower() == 'true':
+        return CACHE_CONTROL['section']
+    if status != 'published':
+        return 'private, no-cache'
+    if params.get('id'):
+        return CACHE_CONTROL['article']
+    if params.get('is_svo', 'false').lower() == 'true' or params.get('is_showbiz', 'false').lower() == 'true':
+        return CACHE_CONTROL['section']
+    if params.get('tag') or params.get('category'):
+        return CACHE_CONTROL['filtered']
+    return CACHE_CONTROL['feed']
+
+def list_etag(cache_key: Tuple, news_version: int) -> str:
+    '''
+    Strong validator for a listing without touching the news table: the
+    normalized query parameters plus cache_versions.news, which every write and
+    every counter fold bumps. Pending counter deltas are deliberately left out
+    so hot lists stay cacheable between scheduler folds.
+    '''
+    return make_etag(cache_key, news_version)
+
+def not_modified_response(headers: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        'statusCode': 304,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            **headers
+        },
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+def get_client_ip(event: Dict[str, Any]) -> Optional[str]:
+    headers = event.get('headers') or {}
+    forwarded = headers.get('X-Forwarded-For') or headers.get('x-forwarded-for')
+    if forwarded:
+        return forwarded.split(',')[0].strip()[:45]
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    return identity.get('sourceIp')
+
+def record_counter_delta(cur, news_id: Any, views: int, likes: int, ip_address: Optional[str]):
+    '''
+    Append a view/like to the write-behind buffer instead of updating the hot
+    news row. The scheduler folds news_counter_deltas into news.views/likes and
+    news_unique_views in one batch. Nothing is written for an id that does
+    not exist, so the fold never sees orphan rows.
+    '''
+    cur.execute('''
+        INSERT INTO news_counter_deltas (news_id, views_delta, likes_delta, ip_address)
+        SELECT id, %s, %s, %s FROM news WHERE id = %s
+    ''', (views, likes, ip_address, news_id))
+
+def merge_pending_counters(cur, items: List[Dict[str, Any]]):
+    '''Add not yet folded deltas to views/likes of already fetched rows'''
+    ids = [item['id'] for item in items if 'id' in item and ('views' in item or 'likes' in item)]
+    if not ids:
+        return
+
+    execute_prepared(cur, '''
+        SELECT news_id, SUM(views_delta) as views, SUM(likes_delta) as likes
+        FROM news_counter_deltas
+        WHERE news_id = ANY(%s)
+        GROUP BY news_id
+    ''', (ids,))
+    pending = {row['news_id']: row for row in cur.fetchall()}
+    if not pending:
+        return
+
+    for item in items:
+        delta = pending.get(item.get('id'))
+        if not delta:
+            continue
+        if 'views' in item:
+            item['views'] = (item['views'] or 0) + int(delta['views'])
+        if 'likes' in item:
+            item['likes'] = (item['likes'] or 0) + int(delta['likes'])
+
+def export_response(conn, params: Dict[str, Any], admin: bool) -> Dict[str, Any]:
+    '''
+    export=ndjson|csv: one chunk of the archive in id order, X-Next-After
+    carries the id for the next request (absent on the last chunk).
+    destination=s3 uploads the whole archive and returns a signed link.
+    Anyone may export published news; drafts, deleted rows (status=all for
+    every row) and the S3 upload need the admin token.
+    '''
+    fmt = params['export']
+    status = params.get('status') or 'published'
+    if (status != 'published' or params.get('destination') == 's3') and not admin:
+        return {
+            'statusCode': 403,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Admin token required'}),
+            'isBase64Encoded': False
+        }
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"export must be one of: {', '.join(EXPORT_FORMATS)}")
+        columns = parse_fields(params.get('fields')) or list(NEWS_COLUMNS) + ['author_name']
+        if 'id' not in columns:
+            columns = ['id'] + columns
+        if status != 'all' and status not in NEWS_STATUSES:
+            raise ValueError(f"status must be one of: {', '.join(NEWS_STATUSES)}, all")
+        after = params.get('after', '0')
+        if not after.isdigit():
+            raise ValueError('Invalid after')
+        limit = min(parse_limit(params.get('limit'), EXPORT_CHUNK_ROWS), EXPORT_CHUNK_MAX)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)}),
+            'isBase64Encoded': False
+        }
+
+    if status == 'all':
+        status = None
+
+    if params.get('destination') == 's3':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Cache-Control': 'no-store'
+            },
+            'body': json.dumps(export_to_s3(conn, fmt, columns, status)),
+            'isBase64Encoded': False
+        }
+
+    body, count, next_after = export_chunk(conn, fmt, columns, status, int(after), limit)
+    headers = {
+        'Content-Type': EXPORT_FORMATS[fmt][0],
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Next-After, X-Row-Count',
+        'Cache-Control': 'no-store',
+        'X-Row-Count': str(count)
+    }
+    if next_after is not None:
+        headers['X-Next-After'] = str(next_after)
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': False
+    }
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Manage news articles - get all, get by id, create, update, delete, filter by tag
-    Args: event with httpMethod, body, queryStringParameters (supports tag filtering)
+    Args: event with httpMethod, body, queryStringParameters (supports tag filtering,
+          cursor/limit keyset pagination returning next_cursor,
+          fields= column list or 'card' profile for lighter list payloads,
+          conditional GET via If-None-Match / If-Modified-Since,
+          featured=true for the single pinned article (null when none is pinned),
+          sort=trending for the ranking precomputed by the scheduler,
+          facets=true for published counts per category, tag and section,
+          id=X&related=true for the precomputed "read also" list (card fields by default),
+          ids=1,2,3 or POST {"ids": [...]} to fetch many articles at once,
+          changed_since=<ISO timestamp | high_water_mark> for delta sync,
+          export=ndjson|csv (after, limit, status, destination=s3) for archive export
+          (published only unless X-Admin-Token matches ADMIN_TOKEN),
+          POST ?action=import with a JSON array or NDJSON body for bulk upsert)
           context with request_id
     Returns: HTTP response with news data
     '''
@@ -35,7 +692,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -55,7 +712,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     try:
         if method == 'GET':
@@ -68,34 +725,105 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             increment_likes = params.get('increment_likes', 'false').lower() == 'true'
             is_svo = params.get('is_svo', 'false').lower() == 'true'
             is_showbiz = params.get('is_showbiz', 'false').lower() == 'true'
-            limit = params.get('limit', '100')
+            featured = params.get('featured', 'false').lower() == 'true'
+            trending = params.get('sort') == 'trending'
+            facets = params.get('facets', 'false').lower() == 'true'
+            limit = params.get('limit')
+            paginate = 'cursor' in params
+            
+            if params.get('pool_stats', 'false').lower() == 'true':
+                if not is_admin(event):
+                    return {
+                        'statusCode': 403,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'error': 'Admin token required'}),
+                        'isBase64Encoded': False
+                    }
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Cache-Control': 'no-store'
+                    },
+                    'body': json.dumps({**pool_stats(), 'listing_cache': LISTING_CACHE.snapshot(), 'compressed_cache': COMPRESSED_CACHE.snapshot()}),
+                    'isBase64Encoded': False
+                }
+            
+            if params.get('export'):
+                return compress_response(event, export_response(conn, params, is_admin(event)))
             
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                if news_id and params.get('related', 'false').lower() == 'true':
+                    try:
+                        if not news_id.isdigit():
+                            raise ValueError('Invalid id')
+                        related = fetch_related(cur, int(news_id), parse_fields(params.get('fields')))
+                    except ValueError as e:
+                        return {
+                            'statusCode': 400,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({'error': str(e)}),
+                            'isBase64Encoded': False
+                        }
+                    
+                    merge_pending_counters(cur, related)
+                    return compress_response(event, {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*',
+                            'Cache-Control': CACHE_CONTROL['section']
+                        },
+                        'body': dumps(related),
+                        'isBase64Encoded': False
+                    })
+                
                 if news_id:
-                    if increment_views:
-                        cur.execute('''
-                            UPDATE news 
-                            SET views = COALESCE(views, 0) + 1 
-                            WHERE id = %s
-                        ''', (news_id,))
+                    if increment_views or increment_likes:
+                        record_counter_delta(
+                            cur, news_id,
+                            1 if increment_views else 0,
+                            1 if increment_likes else 0,
+                            get_client_ip(event) if increment_views else None
+                        )
                         conn.commit()
-                    
-                    if increment_likes:
-                        cur.execute('''
-                            UPDATE news 
-                            SET likes = COALESCE(likes, 0) + 1 
-                            WHERE id = %s
+                        cache_headers = {'Cache-Control': 'no-store'}
+                    else:
+                        execute_prepared(cur, '''
+                            SELECT updated_at, views, likes FROM news WHERE id = %s
                         ''', (news_id,))
-                        conn.commit()
+                        validator = cur.fetchone()
+                        cache_headers = {}
+                        if validator:
+                            etag = make_etag(news_id, validator['updated_at'], validator['views'], validator['likes'])
+                            cache_headers = {
+                                'ETag': etag,
+                                'Cache-Control': cache_control_for(params, 'published')
+                            }
+                            if validator['updated_at']:
+                                cache_headers['Last-Modified'] = http_date(validator['updated_at'])
+                            if is_not_modified(event, etag, validator['updated_at']):
+                                return not_modified_response(cache_headers)
                     
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
+                    execute_prepared(cur, f'''
+                        SELECT {NEWS_SELECT}
                         FROM news n 
                         LEFT JOIN authors a ON n.author_id = a.id 
                         WHERE n.id = %s
                     ''', (news_id,))
                     news = cur.fetchone()
                     
+                    if news:
+                        news = dict(news)
+                        merge_pending_counters(cur, [news])
+                    
                     if not news:
                         return {
                             'statusCode': 404,
@@ -107,60 +835,175 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                             'isBase64Encoded': False
                         }
                     
-                    return {
+                    return compress_response(event, {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*',
+                            **cache_headers
+                        },
+                        'body': dumps(news),
+                        'isBase64Encoded': False
+                    })
+                
+                if params.get('ids'):
+                    return compress_response(event, batch_response(cur, params['ids'], params.get('fields')))
+                
+                if params.get('changed_since'):
+                    try:
+                        changes = fetch_news_changes(cur, params['changed_since'], limit, parse_fields(params.get('fields')))
+                    except ValueError as e:
+                        return {
+                            'statusCode': 400,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*'
+                            },
+                            'body': json.dumps({'error': str(e)}),
+                            'isBase64Encoded': False
+                        }
+                    
+                    return compress_response(event, {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*',
+                            'Cache-Control': 'no-cache'
+                        },
+                        'body': dumps(changes),
+                        'isBase64Encoded': False
+                    })
+                
+                cache_key = make_key(params)
+                news_version = get_news_version(cur)
+                etag = list_etag(cache_key, news_version)
+                cache_headers = {'ETag': etag, 'Cache-Control': cache_control_for(params, status)}
+                if is_not_modified(event, etag):
+                    return not_modified_response(cache_headers)
+                
+                if status == 'published':
+                    cached = LISTING_CACHE.get(cache_key, news_version)
+                    if cached:
+                        return compress_response(event, {
+                            'statusCode': 200,
+                            'headers': {
+                                'Content-Type': 'application/json',
+                                'Access-Control-Allow-Origin': '*',
+                                **cache_headers
+                            },
+                            'body': cached[1],
+                            'isBase64Encoded': False
+                        })
+                
+                if featured:
+                    conditions, values = build_news_filter(status, False, False, None, None, featured=True)
+                    execute_prepared(cur, f'''
+                        SELECT {NEWS_SELECT}
+                        FROM news n
+                        LEFT JOIN authors a ON n.author_id = a.id
+                        WHERE {' AND '.join(conditions)}
+                        LIMIT 1
+                    ''', values)
+                    featured_news = cur.fetchone()
+                    
+                    # No featured article is a normal state of the front page, not an error
+                    if featured_news:
+                        featured_news = dict(featured_news)
+                        merge_pending_counters(cur, [featured_news])
+                    response_json = dumps(featured_news)
+                    if status == 'published':
+                        LISTING_CACHE.put(cache_key, news_version, etag, response_json)
+                    
+                    return compress_response(event, {
                         'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*',
+                            **cache_headers
+                        },
+                        'body': response_json,
+                        'isBase64Encoded': False
+                    })
+                
+                if facets:
+                    response_json = dumps(fetch_facets(cur))
+                    LISTING_CACHE.put(cache_key, news_version, etag, response_json)
+                    
+                    return compress_response(event, {
+                        'statusCode': 200,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*',
+                            **cache_headers
+                        },
+                        'body': response_json,
+                        'isBase64Encoded': False
+                    })
+                
+                try:
+                    if trending:
+                        news_list, next_cursor = fetch_trending(cur, limit, parse_fields(params.get('fields'))), None
+                    else:
+                        news_list, next_cursor = fetch_news_page(
+                            cur, status, is_svo, is_showbiz, tag, category,
+                            params.get('cursor'), limit, paginate,
+                            parse_fields(params.get('fields'))
+                        )
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
                         'headers': {
                             'Content-Type': 'application/json',
                             'Access-Control-Allow-Origin': '*'
                         },
-                        'body': json.dumps(dict(news), default=str),
+                        'body': json.dumps({'error': str(e)}),
                         'isBase64Encoded': False
                     }
                 
-                elif is_svo:
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
-                        FROM news n 
-                        LEFT JOIN authors a ON n.author_id = a.id 
-                        WHERE n.is_svo = TRUE AND n.status = %s
-                        ORDER BY n.published_at DESC
-                        LIMIT %s
-                    ''', (status, int(limit)))
-                elif is_showbiz:
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
-                        FROM news n 
-                        LEFT JOIN authors a ON n.author_id = a.id 
-                        WHERE n.is_showbiz = TRUE AND n.status = %s
-                        ORDER BY n.published_at DESC
-                        LIMIT %s
-                    ''', (status, int(limit)))
-                elif tag:
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
-                        FROM news n 
-                        LEFT JOIN authors a ON n.author_id = a.id 
-                        WHERE %s = ANY(n.tags) AND n.status = %s
-                        ORDER BY n.published_at DESC
-                    ''', (tag, status))
-                elif category:
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
-                        FROM news n 
-                        LEFT JOIN authors a ON n.author_id = a.id 
-                        WHERE n.category = %s AND n.status = %s
-                        ORDER BY n.published_at DESC
-                    ''', (category, status))
-                else:
-                    cur.execute('''
-                        SELECT n.*, a.name as author_name 
-                        FROM news n 
-                        LEFT JOIN authors a ON n.author_id = a.id 
-                        WHERE n.status = %s
-                        ORDER BY n.published_at DESC
-                    ''', (status,))
+                merge_pending_counters(cur, news_list)
+                response_body = {'items': news_list, 'next_cursor': next_cursor} if paginate else news_list
+                response_json = dumps(response_body)
+                if status == 'published':
+                    LISTING_CACHE.put(cache_key, news_version, etag, response_json)
+                
+                return compress_response(event, {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        **cache_headers
+                    },
+                    'body': response_json,
+                    'isBase64Encoded': False
+                })
+        
+        elif method == 'POST':
+            params = event.get('queryStringParameters') or {}
+            if params.get('action') == 'import':
+                raw_body = event.get('body') or ''
+                if event.get('isBase64Encoded'):
+                    raw_body = base64.b64decode(raw_body).decode('utf-8')
+                try:
+                    report = import_news(conn, raw_body, NEWS_STATUSES)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
                 
-                news_list = cur.fetchall()
+                # One sitemap refresh and one cache invalidation for the whole import
+                published = report.pop('published')
+                if report['items']:
+                    with conn.cursor() as cur:
+                        if published:
+                            mark_sitemap_dirty(cur)
+                        bump_news_version(cur)
+                    conn.commit()
                 
                 return {
                     'statusCode': 200,
@@ -168,13 +1011,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps([dict(n) for n in news_list], default=str),
+                    'body': dumps(report),
                     'isBase64Encoded': False
                 }
-        
-        elif method == 'POST':
+            
             body = json.loads(event.get('body', '{}'))
             
+            if 'ids' in body:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    return compress_response(event, batch_response(cur, body['ids'], body.get('fields')))
+            
             title = body.get('title', '')
             category = body.get('category', '')
             excerpt = body.get('excerpt', '')
@@ -201,24 +1047,25 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 if is_featured:
-                    cur.execute('UPDATE news SET is_featured = FALSE')
+                    clear_featured(cur)
                 
                 random_likes = random.randint(0, 100)
                 is_svo = body.get('is_svo', False)
                 is_showbiz = body.get('is_showbiz', False)
                 
-                cur.execute('''
+                cur.execute(f'''
                     INSERT INTO news (title, category, excerpt, content, image_url, video_url, author_id, read_time, status, is_featured, likes, tags, is_svo, is_showbiz, keywords)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING *
+                    RETURNING {NEWS_RETURNING}
                 ''', (title, category, excerpt, content, image_url, video_url, author_id, read_time, status, is_featured, random_likes, tags, is_svo, is_showbiz, keywords))
                 
                 new_news = cur.fetchone()
-                conn.commit()
                 
-                # Trigger sitemap regeneration
                 if status == 'published':
-                    trigger_sitemap_regeneration()
+                    mark_sitemap_dirty(cur)
+                bump_news_version(cur)
+                
+                conn.commit()
                 
                 return {
                     'statusCode': 201,
@@ -226,7 +1073,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps(dict(new_news), default=str),
+                    'body': dumps(new_news),
                     'isBase64Encoded': False
                 }
         
@@ -305,20 +1152,22 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 if body.get('is_featured'):
-                    cur.execute('UPDATE news SET is_featured = FALSE')
+                    clear_featured(cur, news_id)
                 cur.execute(f'''
                     UPDATE news 
                     SET {', '.join(fields)}
                     WHERE id = %s
-                    RETURNING *
+                    RETURNING {NEWS_RETURNING}
                 ''', values)
                 
                 updated_news = cur.fetchone()
-                conn.commit()
                 
-                # Trigger sitemap regeneration if status changed to published
-                if body.get('status') == 'published':
-                    trigger_sitemap_regeneration()
+                if updated_news and body.get('status') == 'published':
+                    mark_sitemap_dirty(cur)
+                if updated_news:
+                    bump_news_version(cur)
+                
+                conn.commit()
                 
                 if not updated_news:
                     return {
@@ -337,7 +1186,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps(dict(updated_news), default=str),
+                    'body': dumps(updated_news),
                     'isBase64Encoded': False
                 }
         
@@ -357,10 +1206,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             with conn.cursor() as cur:
-                cur.execute('UPDATE news SET status = %s WHERE id = %s', ('deleted', news_id))
+                cur.execute('UPDATE news SET status = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s', ('deleted', news_id))
+                deleted = cur.rowcount
+                if deleted > 0:
+                    mark_sitemap_dirty(cur)
+                    bump_news_version(cur)
                 conn.commit()
                 
-                if cur.rowcount == 0:
+                if deleted == 0:
                     return {
                         'statusCode': 404,
                         'headers': {
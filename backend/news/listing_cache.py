@@ -0,0 +1,83 @@
+'''
+Process-local read-through cache for news listings. Entries live across warm
+invocations, are bounded by count and total body size (LRU eviction) and expire
+after a TTL. Each entry remembers the cache_versions value it was built for, so
+a write in any instance invalidates every other instance on its next lookup.
+'''
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+CACHE_TTL = float(os.environ.get('NEWS_CACHE_TTL', '30'))
+CACHE_MAX_ENTRIES = int(os.environ.get('NEWS_CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_BYTES = int(os.environ.get('NEWS_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+
+class ListingCache:
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple, Tuple[int, float, str, str]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0}
+
+    def get(self, key: Tuple, version: int) -> Optional[Tuple[str, str]]:
+        '''Return (etag, body) if the entry is fresh and built for this version'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            entry_version, expires_at, etag, body = entry
+            if entry_version != version or expires_at < time.monotonic():
+                self.stats['stale'] += 1
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return etag, body
+
+    def put(self, key: Tuple, version: int, etag: str, body: str):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, time.monotonic() + self.ttl, etag, body)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats['evictions'] += 1
+
+    def _remove(self, key: Tuple):
+        _, _, _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, **self.stats}
+
+
+def make_key(params: Dict[str, Any]) -> Tuple:
+    '''Normalize query parameters: order-independent, case-insensitive flags'''
+    normalized = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name in ('is_svo', 'is_showbiz', 'featured'):
+            value = str(value).lower()
+            if value != 'true':
+                continue
+        normalized.append((name, str(value)))
+    return tuple(sorted(normalized))
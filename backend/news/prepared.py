@@ -0,0 +1,88 @@
+'''
+Server-side prepared statements for the hot news queries. Pooled connections
+live across warm invocations, so each distinct SQL text is PREPAREd once per
+connection and later calls only send EXECUTE with the parameters, skipping
+parse/analyze and (after a few runs) planning.
+
+Set NEWS_PREPARED_STATEMENTS=false behind a transaction-mode pooler
+(PgBouncer and the like): it may hand every transaction a different server
+connection, where the prepared name does not exist. Queries then go out as
+plain ad-hoc SQL, exactly as before.
+
+tools/news_prepared_benchmark.py compares ad-hoc and prepared timings.
+'''
+import hashlib
+import os
+import re
+from typing import Any, Dict, Sequence
+
+import psycopg2.extensions
+
+PREPARED_STATEMENTS = os.environ.get('NEWS_PREPARED_STATEMENTS', 'true').lower() == 'true'
+# Safety net on top of prepare=False for custom fields=: past this limit the rest run ad hoc
+MAX_PREPARED_PER_CONNECTION = 64
+
+PLACEHOLDER = re.compile(r'%s')
+
+
+def to_positional(query: str) -> str:
+    '''Turn psycopg2 %s placeholders into $1, $2, ... for PREPARE'''
+    counter = iter(range(1, query.count('%s') + 1))
+    return PLACEHOLDER.sub(lambda _: f'${next(counter)}', query)
+
+
+def statement_cache(conn) -> Dict[str, str]:
+    prepared = getattr(conn, 'prepared_statements', None)
+    if prepared is None:
+        prepared = {}
+        conn.prepared_statements = prepared
+    return prepared
+
+
+def force_generic_plans(conn):
+    '''
+    LIMIT is a parameter, and for LIMIT $n the planner costs the generic plan
+    as if a tenth of the table were fetched, so on its own it would re-plan
+    every EXECUTE. tools/news_plan_check.py verifies the generic plans, so
+    the session always uses them. SET is transactional: it is committed
+    straight away, which is only done while no transaction is open.
+    '''
+    if getattr(conn, 'generic_plans', False):
+        return
+    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        return
+    with conn.cursor() as cur:
+        cur.execute('SET plan_cache_mode = force_generic_plan')
+    if not conn.autocommit:
+        conn.commit()
+    conn.generic_plans = True
+
+
+def execute_prepared(cur, query: str, values: Sequence[Any] = (), prepare: bool = True):
+    '''
+    cur.execute(query, values) through a per-connection prepared statement.
+    PREPARE is not transactional, so a statement stays valid for the
+    connection even if the surrounding transaction is rolled back.
+    prepare=False runs the query ad hoc (one-off variants such as custom
+    fields= lists that would only crowd out the statement slots).
+    '''
+    if not prepare or not PREPARED_STATEMENTS or not hasattr(cur.connection, '__dict__'):
+        cur.execute(query, values)
+        return
+
+    force_generic_plans(cur.connection)
+    prepared = statement_cache(cur.connection)
+    name = prepared.get(query)
+    if name is None:
+        if len(prepared) >= MAX_PREPARED_PER_CONNECTION:
+            cur.execute(query, values)
+            return
+        name = 'news_' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+        cur.execute(f'PREPARE {name} AS {to_positional(query)}')
+        prepared[query] = name
+
+    if values:
+        cur.execute(f'EXECUTE {name} ({", ".join(["%s"] * len(values))})', values)
+    else:
+        cur.execute(f'EXECUTE {name}')
+
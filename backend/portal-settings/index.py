@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from fast_json import RowEncoder, dumps
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 
@@ -29,7 +30,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     resource = params.get('resource', 'authors')
     
     dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     try:
         with conn.cursor() as cur:
@@ -76,9 +77,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     if resource == 'authors':
         if method == 'GET':
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor() as cur:
                 cur.execute('SELECT * FROM authors ORDER BY created_at DESC')
-                authors = cur.fetchall()
+                authors = RowEncoder(cur.description).rows(cur.fetchall())
             conn.close()
             
             return {
@@ -88,7 +89,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps([dict(a) for a in authors], default=str)
+                'body': dumps(authors)
             }
         
         if method == 'POST':
@@ -114,7 +115,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps(dict(new_author), default=str)
+                'body': dumps(new_author)
             }
         
         if method == 'PUT':
@@ -175,7 +176,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps(dict(about) if about else {}, default=str)
+                'body': dumps(about or {})
             }
         
         if method == 'PUT':
@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from compression import compress_response
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 from datetime import datetime
@@ -39,7 +40,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     feed_type = params.get('feed_type', 'news')
     
     dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute('''
@@ -61,7 +62,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     else:
         rss_xml = generate_news_feed(news_items, base_url)
     
-    return {
+    return compress_response(event, {
         'statusCode': 200,
         'headers': {
             'Content-Type': 'application/rss+xml; charset=utf-8',
@@ -70,7 +71,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         },
         'isBase64Encoded': False,
         'body': rss_xml
-    }
+    })
 
 def generate_news_feed(news_items, base_url):
     rss_items = []
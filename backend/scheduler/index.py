@@ -2,13 +2,178 @@ import json
 import os
 from typing import Dict, Any
 from datetime import datetime, time
-import psycopg2
+from db_pool import get_connection
+from related import refresh_related_articles
 from psycopg2.extras import RealDictCursor
 import urllib.request
 
+UPDATE_SITEMAP_URL = 'https://functions.poehali.dev/a3682adf-931b-4c62-8bd9-3f1fc603b95c'
+SOCIAL_OUTBOX_DRAIN_URL = 'https://functions.poehali.dev/a82256af-0286-4392-a152-571238c8af04?action=drain'
+SITEMAP_REBUILD_WINDOW = int(os.environ.get('SITEMAP_REBUILD_WINDOW', '300'))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_WINDOW_DAYS = int(os.environ.get('TRENDING_WINDOW_DAYS', '7'))
+TRENDING_WEIGHTS = {'views': 1.0, 'likes': 5.0, 'comments': 10.0}
+
+def rebuild_sitemap_if_dirty(conn) -> bool:
+    '''
+    Coalesce sitemap rebuilds: news publishing only sets sitemap_state.dirty_since,
+    here we claim the flag at most once per SITEMAP_REBUILD_WINDOW seconds and call
+    update-sitemap (which also pings search engines). On failure the flag is restored.
+    '''
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE sitemap_state s
+            SET dirty_since = NULL, last_rebuild_at = CURRENT_TIMESTAMP
+            FROM (SELECT dirty_since FROM sitemap_state WHERE id = 1 FOR UPDATE) prev
+            WHERE s.id = 1
+              AND prev.dirty_since IS NOT NULL
+              AND (s.last_rebuild_at IS NULL
+                   OR s.last_rebuild_at <= CURRENT_TIMESTAMP - make_interval(secs => %s))
+            RETURNING prev.dirty_since
+        """, (SITEMAP_REBUILD_WINDOW,))
+        claimed = cur.fetchone()
+    conn.commit()
+
+    if not claimed:
+        return False
+
+    try:
+        req = urllib.request.Request(UPDATE_SITEMAP_URL, method='GET')
+        with urllib.request.urlopen(req, timeout=15) as response:
+            result = json.loads(response.read().decode('utf-8'))
+            print(f"Sitemap updated and search engines notified: {result.get('ping_results', {})}")
+        return True
+    except Exception as e:
+        print(f"Failed to update sitemap: {str(e)}")
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE sitemap_state
+                SET dirty_since = COALESCE(dirty_since, %s), last_rebuild_at = NULL
+                WHERE id = 1
+            """, (claimed[0],))
+        conn.commit()
+        return False
+
+def fold_news_counters(conn) -> int:
+    '''
+    Fold buffered view/like deltas from news_counter_deltas into news in one
+    batched UPDATE, record the viewers' IPs in news_unique_views and bump the
+    news cache version
+    '''
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH moved AS (
+                DELETE FROM news_counter_deltas
+                RETURNING news_id, views_delta, likes_delta, ip_address
+            ), unique_views AS (
+                INSERT INTO news_unique_views (news_id, ip_address)
+                SELECT DISTINCT news_id, ip_address
+                FROM moved
+                WHERE ip_address IS NOT NULL AND views_delta > 0
+                ON CONFLICT (news_id, ip_address) DO NOTHING
+            ), totals AS (
+                SELECT news_id, SUM(views_delta) AS views, SUM(likes_delta) AS likes
+                FROM moved
+                GROUP BY news_id
+            )
+            UPDATE news n
+            SET views = COALESCE(n.views, 0) + totals.views,
+                likes = COALESCE(n.likes, 0) + totals.likes
+            FROM totals
+            WHERE n.id = totals.news_id
+        """)
+        folded = cur.rowcount
+        if folded > 0:
+            # Listings embed the counters: invalidate their ETags and caches
+            cur.execute("""
+                UPDATE cache_versions
+                SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE name = 'news'
+            """)
+    conn.commit()
+    return folded
+
+def refresh_news_trending(conn) -> Dict[str, int]:
+    '''
+    Incrementally update news_trending: every score decays exponentially
+    (TRENDING_HALF_LIFE_HOURS) to now, then only the views/likes gained since the
+    last run and comments past the trending_state watermark are added. Articles
+    seen for the first time get their lifetime counters decayed from
+    published_at; articles leaving the window or unpublished are dropped.
+    '''
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH state AS (
+                SELECT last_comment_id FROM trending_state WHERE id = 1 FOR UPDATE
+            ), new_comments AS (
+                SELECT c.news_id, COUNT(*) AS comments, MAX(c.id) AS max_id
+                FROM comments c, state
+                WHERE c.id > state.last_comment_id
+                GROUP BY c.news_id
+            ), candidates AS (
+                SELECT n.id, n.published_at, COALESCE(n.views, 0) AS views, COALESCE(n.likes, 0) AS likes
+                FROM news n
+                WHERE n.status = 'published'
+                  AND n.published_at >= CURRENT_TIMESTAMP - make_interval(days => %(window_days)s)
+            ), scored AS (
+                SELECT c.id, c.views, c.likes,
+                       COALESCE(t.score * exp(-ln(2) * extract(epoch FROM CURRENT_TIMESTAMP - t.scored_at) / %(half_life)s), 0) AS decayed,
+                       (%(w_views)s * GREATEST(c.views - COALESCE(t.seen_views, 0), 0)
+                        + %(w_likes)s * GREATEST(c.likes - COALESCE(t.seen_likes, 0), 0)
+                        + %(w_comments)s * COALESCE(nc.comments, 0))
+                       * CASE WHEN t.news_id IS NULL
+                              THEN exp(-ln(2) * GREATEST(extract(epoch FROM CURRENT_TIMESTAMP - c.published_at), 0) / %(half_life)s)
+                              ELSE 1 END AS increment
+                FROM candidates c
+                LEFT JOIN news_trending t ON t.news_id = c.id
+                LEFT JOIN new_comments nc ON nc.news_id = c.id
+            ), upserted AS (
+                INSERT INTO news_trending (news_id, score, seen_views, seen_likes, scored_at)
+                SELECT id, decayed + increment, views, likes, CURRENT_TIMESTAMP
+                FROM scored
+                ON CONFLICT (news_id) DO UPDATE
+                SET score = EXCLUDED.score,
+                    seen_views = EXCLUDED.seen_views,
+                    seen_likes = EXCLUDED.seen_likes,
+                    scored_at = EXCLUDED.scored_at
+                RETURNING news_id
+            ), pruned AS (
+                DELETE FROM news_trending
+                WHERE news_id NOT IN (SELECT id FROM candidates)
+                RETURNING news_id
+            ), watermark AS (
+                UPDATE trending_state
+                SET last_comment_id = GREATEST(last_comment_id, COALESCE((SELECT MAX(max_id) FROM new_comments), 0)),
+                    refreshed_at = CURRENT_TIMESTAMP
+                WHERE id = 1
+            )
+            SELECT (SELECT COUNT(*) FROM upserted) AS ranked,
+                   (SELECT COUNT(*) FROM scored WHERE increment > 0) AS changed,
+                   (SELECT COUNT(*) FROM pruned) AS pruned
+        """, {
+            'window_days': TRENDING_WINDOW_DAYS,
+            'half_life': TRENDING_HALF_LIFE_HOURS * 3600,
+            'w_views': TRENDING_WEIGHTS['views'],
+            'w_likes': TRENDING_WEIGHTS['likes'],
+            'w_comments': TRENDING_WEIGHTS['comments']
+        })
+        ranked, changed, pruned = cur.fetchone()
+        if changed or pruned:
+            # Decay alone keeps the order; only new activity reshuffles the list
+            cur.execute("""
+                UPDATE cache_versions
+                SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE name = 'news'
+            """)
+    conn.commit()
+    return {'ranked': ranked, 'changed': changed, 'pruned': pruned}
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: Daily scheduler for generating AI city posts at specific times
+    Business: Daily scheduler for generating AI city posts at specific times,
+              also folds buffered news view/like counters, refreshes the trending
+              ranking and related articles, rebuilds a stale sitemap (debounced)
+              and drains the social publishing outbox on every run
     Args: event - dict with httpMethod
           context - object with request_id
     Returns: HTTP response with generation status
@@ -48,9 +213,44 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'DATABASE_URL not configured'})
         }
     
-    conn = psycopg2.connect(db_url)
+    conn = get_connection(db_url)
     
     try:
+        try:
+            folded = fold_news_counters(conn)
+            print(f"Folded counters for {folded} news")
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to fold news counters: {str(e)}")
+        
+        try:
+            trending = refresh_news_trending(conn)
+            print(f"Trending refreshed: {trending}")
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to refresh trending: {str(e)}")
+        
+        try:
+            related = refresh_related_articles(conn)
+            print(f"Related articles refreshed: {related}")
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to refresh related articles: {str(e)}")
+        
+        try:
+            rebuild_sitemap_if_dirty(conn)
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to rebuild sitemap: {str(e)}")
+        
+        try:
+            req = urllib.request.Request(SOCIAL_OUTBOX_DRAIN_URL, data=b'{}', method='POST',
+                                         headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(req, timeout=40) as response:
+                print(f"Social outbox drained: {response.read().decode('utf-8')}")
+        except Exception as e:
+            print(f"Failed to drain social outbox: {str(e)}")
+        
         current_hour = datetime.now().hour
         current_minute = datetime.now().minute
         
@@ -0,0 +1,277 @@
+'''
+"Read also" precomputation: top RELATED_TOP_N similar articles per news id,
+stored in news_related for a single primary-key read from the news function.
+
+Similarity of two published articles is
+    RELATED_WEIGHTS['tags'] * Jaccard(tags) + RELATED_WEIGHTS['keywords'] * cosine(keyword TF-IDF)
+where keyword terms are the lowercased words of the comma separated keywords
+column (kept in news_keywords by a trigger) and IDF is taken over the
+published articles of the last RELATED_WINDOW_DAYS.
+
+Each run only recomputes lists of articles changed since the (updated_at, id)
+watermark, of articles whose lists point at them and of their new neighbours,
+and reads only the postings those articles touch. IDF drifts slowly, so lists
+nobody touched keep their slightly older scores.
+'''
+import heapq
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+from psycopg2.extras import execute_values
+
+RELATED_TOP_N = int(os.environ.get('RELATED_TOP_N', '6'))
+RELATED_WINDOW_DAYS = int(os.environ.get('RELATED_WINDOW_DAYS', '365'))
+RELATED_BATCH = int(os.environ.get('RELATED_BATCH', '300'))
+RELATED_WEIGHTS = {'tags': 0.5, 'keywords': 0.5}
+# Candidates per term come from its most recent postings only: a tag on every
+# fifth article would otherwise make each list compare against thousands of rows
+MAX_POSTINGS_PER_TERM = 500
+# Same commit-lag margin as changed_since in the news function: updated_at is
+# stamped before the writing transaction commits, so the watermark never moves
+# closer to now than this and a row committed late is still picked up
+RELATED_SAFETY_LAG_SECONDS = 2
+
+IN_WINDOW = 'published_at >= CURRENT_TIMESTAMP - make_interval(days => %s)'
+
+
+class Corpus:
+    '''
+    Tags, keyword TF-IDF vectors and postings of the ranked window, read on
+    demand: only the articles being ranked, the most recent postings of their
+    tags and terms (news_tags, news_keywords) and the candidates those
+    postings name are loaded, never the whole window.
+    '''
+
+    def __init__(self, cur):
+        self.cur = cur
+        self.tags: Dict[int, Set[str]] = {}
+        self.vectors: Dict[int, Dict[str, float]] = {}
+        self.tag_postings: Dict[str, List[int]] = {}
+        self.term_postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.document_frequency: Dict[str, int] = {}
+        self.fetched: Set[int] = set()
+        self.indexed: Set[int] = set()
+        cur.execute(f'''
+            SELECT COUNT(*) FROM news
+            WHERE status = 'published' AND {IN_WINDOW}
+        ''', (RELATED_WINDOW_DAYS,))
+        self.total = cur.fetchone()[0] or 1
+
+    def __contains__(self, news_id: int) -> bool:
+        return news_id in self.tags
+
+    def fetch(self, news_ids: Iterable[int]):
+        '''Tags and keyword vectors of the given articles that are in the window'''
+        missing = [news_id for news_id in set(news_ids) if news_id not in self.fetched]
+        if not missing:
+            return
+        self.fetched.update(missing)
+        self.cur.execute(f'''
+            SELECT id, tags FROM news
+            WHERE id = ANY(%s) AND status = 'published' AND {IN_WINDOW}
+        ''', (missing, RELATED_WINDOW_DAYS))
+        term_counts: Dict[int, Dict[str, int]] = {}
+        for news_id, tags in self.cur.fetchall():
+            self.tags[news_id] = {tag.lower() for tag in (tags or []) if tag}
+            term_counts[news_id] = {}
+        if not term_counts:
+            return
+
+        self.cur.execute('SELECT news_id, term, count FROM news_keywords WHERE news_id = ANY(%s)',
+                         (list(term_counts),))
+        for news_id, term, count in self.cur.fetchall():
+            term_counts[news_id][term] = count
+        unknown = {term for counts in term_counts.values() for term in counts} - self.document_frequency.keys()
+        if unknown:
+            self.cur.execute(f'''
+                SELECT term, COUNT(*) FROM news_keywords
+                WHERE term = ANY(%s) AND status = 'published' AND {IN_WINDOW}
+                GROUP BY term
+            ''', (list(unknown), RELATED_WINDOW_DAYS))
+            self.document_frequency.update({term: 1 for term in unknown})
+            self.document_frequency.update(self.cur.fetchall())
+
+        for news_id, counts in term_counts.items():
+            vector = {
+                term: (1 + math.log(count)) * math.log(self.total / self.document_frequency[term])
+                for term, count in counts.items()
+            }
+            norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+            self.vectors[news_id] = {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def index(self, news_ids: Iterable[int]):
+        '''
+        Load the postings top_related walks for the given articles: the
+        MAX_POSTINGS_PER_TERM most recent published articles of each of their
+        tags and keyword terms, and those articles themselves. Tags are
+        matched by lower(tag), the same way similarity compares them.
+        '''
+        news_ids = set(news_ids)
+        self.fetch(news_ids)
+        ranked = [news_id for news_id in news_ids if news_id in self and news_id not in self.indexed]
+        self.indexed.update(ranked)
+        tags = {tag for news_id in ranked for tag in self.tags[news_id]} - self.tag_postings.keys()
+        terms = {term for news_id in ranked for term in self.vectors[news_id]} - self.term_postings.keys()
+
+        postings: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for table, key, wanted in (('news_tags', 'lower(tag)', tags), ('news_keywords', 'term', terms)):
+            if not wanted:
+                continue
+            self.cur.execute(f'''
+                SELECT w.value, p.news_id
+                FROM unnest(%s::text[]) AS w(value)
+                CROSS JOIN LATERAL (
+                    SELECT news_id FROM {table}
+                    WHERE {key} = w.value AND status = 'published' AND {IN_WINDOW}
+                    ORDER BY published_at DESC, news_id DESC
+                    LIMIT %s
+                ) AS p
+            ''', (list(wanted), RELATED_WINDOW_DAYS, MAX_POSTINGS_PER_TERM))
+            for value, news_id in self.cur.fetchall():
+                postings[(table, value)].append(news_id)
+        self.fetch(news_id for ids in postings.values() for news_id in ids)
+
+        for tag in tags:
+            # An article tagged both "Город" and "город" posts twice under "город"
+            self.tag_postings[tag] = [
+                news_id for news_id in dict.fromkeys(postings.get(('news_tags', tag), [])) if news_id in self
+            ]
+        for term in terms:
+            self.term_postings[term] = [
+                (news_id, self.vectors[news_id][term])
+                for news_id in postings.get(('news_keywords', term), [])
+                if term in self.vectors.get(news_id, {})
+            ]
+
+    def top_related(self, news_id: int) -> List[Tuple[int, float]]:
+        '''
+        Score every article sharing a tag or keyword term by walking the
+        postings once: tag intersections and TF-IDF dot products accumulate
+        per candidate, so cost is the postings length, not pairs of vectors.
+        '''
+        self.index([news_id])
+        shared_tags: Dict[int, int] = defaultdict(int)
+        dot: Dict[int, float] = defaultdict(float)
+        tags = self.tags[news_id]
+        for tag in tags:
+            for other in self.tag_postings[tag]:
+                shared_tags[other] += 1
+        for term, weight in self.vectors[news_id].items():
+            for other, other_weight in self.term_postings[term]:
+                dot[other] += weight * other_weight
+
+        partial = []
+        for other in shared_tags.keys() | dot.keys():
+            if other == news_id:
+                continue
+            shared = shared_tags.get(other, 0)
+            tag_score = shared / (len(tags) + len(self.tags[other]) - shared) if shared else 0.0
+            partial.append((other, RELATED_WEIGHTS['tags'] * tag_score + RELATED_WEIGHTS['keywords'] * dot.get(other, 0.0)))
+
+        # Truncated postings can miss part of a candidate's score: rescore the
+        # shortlist exactly. Equal scores prefer the fresher article (higher id).
+        shortlist = heapq.nlargest(RELATED_TOP_N * 4, partial, key=lambda item: (item[1], item[0]))
+        scored = [(other, self.similarity(news_id, other)) for other, _ in shortlist]
+        return heapq.nlargest(RELATED_TOP_N, [item for item in scored if item[1] > 0],
+                              key=lambda item: (item[1], item[0]))
+
+    def similarity(self, a: int, b: int) -> float:
+        tags_a, tags_b = self.tags[a], self.tags[b]
+        shared = len(tags_a & tags_b)
+        tag_score = shared / len(tags_a | tags_b) if shared else 0.0
+        vector_b = self.vectors[b]
+        keyword_score = sum(weight * vector_b.get(term, 0.0) for term, weight in self.vectors[a].items())
+        return RELATED_WEIGHTS['tags'] * tag_score + RELATED_WEIGHTS['keywords'] * keyword_score
+
+    def offer(self, current: List[Tuple[int, float]], news_id: int, other: int) -> List[Tuple[int, float]]:
+        '''Insert other into the existing list of news_id without recomputing it'''
+        merged = [item for item in current if item[0] != other and item[0] in self]
+        score = self.similarity(news_id, other)
+        if score > 0:
+            merged.append((other, score))
+        return heapq.nlargest(RELATED_TOP_N, merged, key=lambda item: (item[1], item[0]))
+
+
+def refresh_related_articles(conn) -> Dict[str, int]:
+    '''
+    Recompute news_related for up to RELATED_BATCH changed articles past the
+    related_state watermark. Unpublished or expired articles lose their list
+    and disappear from the lists of others.
+    '''
+    with conn.cursor() as cur:
+        cur.execute('SELECT last_updated_at, last_news_id FROM related_state WHERE id = 1 FOR UPDATE')
+        last_updated_at, last_news_id = cur.fetchone()
+        if last_updated_at is None:
+            cur.execute('''
+                SELECT id, updated_at FROM news
+                WHERE updated_at <= CURRENT_TIMESTAMP - make_interval(secs => %s)
+                ORDER BY updated_at, id
+                LIMIT %s
+            ''', (RELATED_SAFETY_LAG_SECONDS, RELATED_BATCH))
+        else:
+            cur.execute('''
+                SELECT id, updated_at FROM news
+                WHERE (updated_at, id) > (%s, %s)
+                  AND updated_at <= CURRENT_TIMESTAMP - make_interval(secs => %s)
+                ORDER BY updated_at, id
+                LIMIT %s
+            ''', (last_updated_at, last_news_id, RELATED_SAFETY_LAG_SECONDS, RELATED_BATCH))
+        changed = cur.fetchall()
+        if not changed:
+            conn.rollback()
+            return {'changed': 0, 'recomputed': 0}
+
+        changed_ids = [row[0] for row in changed]
+        cur.execute('SELECT DISTINCT news_id FROM news_related WHERE related_id = ANY(%s)', (changed_ids,))
+        affected = set(changed_ids) | {row[0] for row in cur.fetchall()}
+
+        corpus = Corpus(cur)
+        corpus.index(affected)
+        lists: Dict[int, List[Tuple[int, float]]] = {}
+        for news_id in affected:
+            if news_id in corpus:
+                lists[news_id] = corpus.top_related(news_id)
+
+        # Similarity is symmetric: a changed article may now belong in its
+        # neighbours' lists. Those lists do not contain it yet (else the
+        # neighbour would be in affected), so it is only offered to them.
+        offers: Dict[int, List[int]] = defaultdict(list)
+        for news_id in changed_ids:
+            for neighbour, _ in lists.get(news_id, []):
+                if neighbour not in lists:
+                    offers[neighbour].append(news_id)
+        if offers:
+            cur.execute('''
+                SELECT news_id, related_id, score FROM news_related
+                WHERE news_id = ANY(%s)
+                ORDER BY news_id, rank
+            ''', (list(offers),))
+            current: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+            for news_id, related_id, score in cur.fetchall():
+                current[news_id].append((related_id, score))
+            corpus.fetch(related_id for merged in current.values() for related_id, _ in merged)
+            for neighbour, offered in offers.items():
+                if neighbour not in current:
+                    # Never ranked yet (initial backfill): build its full list
+                    lists[neighbour] = corpus.top_related(neighbour)
+                    continue
+                merged = current[neighbour]
+                for news_id in offered:
+                    merged = corpus.offer(merged, neighbour, news_id)
+                lists[neighbour] = merged
+
+        recomputed = list(affected | set(lists))
+        cur.execute('DELETE FROM news_related WHERE news_id = ANY(%s)', (recomputed,))
+        execute_values(cur, 'INSERT INTO news_related (news_id, rank, related_id, score) VALUES %s', [
+            (news_id, rank, related_id, score)
+            for news_id, related in lists.items()
+            for rank, (related_id, score) in enumerate(related, start=1)
+        ])
+        cur.execute('''
+            UPDATE related_state
+            SET last_updated_at = %s, last_news_id = %s, refreshed_at = CURRENT_TIMESTAMP
+            WHERE id = 1
+        ''', (changed[-1][1], changed[-1][0]))
+    conn.commit()
+    return {'changed': len(changed_ids), 'recomputed': len(recomputed)}
@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import base64
+from db_pool import get_connection
+from fast_json import RowEncoder, dumps
+from compression import compress_response
+from typing import Dict, Any, List, Optional, Tuple
+
+SEARCH_PAGE_SIZE = 10
+SEARCH_PAGE_MAX = 50
+
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" … "'
+
+# Each source exposes the same columns so the branches can be UNIONed and paged together
+SEARCH_SOURCES = {
+    'news': '''
+        SELECT 'news' as type, id, title, excerpt, image_url, published_at as date,
+               content, ts_rank_cd(search_vector, q.query) as rank
+        FROM news, q
+        WHERE search_vector @@ q.query AND status = 'published'
+    ''',
+    'places': '''
+        SELECT 'places' as type, id, title, excerpt, image_url, created_at as date,
+               content, ts_rank_cd(search_vector, q.query) as rank
+        FROM city_places, q
+        WHERE search_vector @@ q.query AND is_published = true
+    ''',
+    'memory': '''
+        SELECT 'memory' as type, id, title, excerpt, image_url, event_date::timestamp as date,
+               content, ts_rank_cd(search_vector, q.query) as rank
+        FROM memory_articles, q
+        WHERE search_vector @@ q.query AND is_published = true
+    '''
+}
+
+URL_PATTERNS = {
+    'news': '/news/{id}',
+    'places': '/places#{id}',
+    'memory': '/memory/{id}'
+}
+
+def build_tsquery(text: str, prefix: Any) -> Optional[str]:
+    '''
+    Turn free text into a to_tsquery expression: words are ANDed, the last one
+    (or every one with prefix=all) becomes a prefix match for typeahead.
+    Only \\w runs survive, so the expression cannot contain tsquery operators.
+    '''
+    words = re.findall(r'\w+', text.lower())[:8]
+    if not words:
+        return None
+    terms = [f'{w}:*' if prefix == 'all' else w for w in words]
+    if prefix:
+        terms[-1] = f'{words[-1]}:*'
+    return ' & '.join(terms)
+
+def encode_cursor(rank: float, kind: str, item_id: int) -> str:
+    raw = json.dumps([rank, kind, item_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[float, str, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, kind, item_id = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+        return float(rank), str(kind), int(item_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def search(cur, tsquery: str, kinds: List[str], cursor: Optional[str],
+           page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Ranked search over the requested sources with keyset paging on
+    (rank, type, id). Headlines are built only for the rows of the page.
+    '''
+    union = ' UNION ALL '.join(SEARCH_SOURCES[k] for k in kinds)
+    values: List[Any] = [tsquery]
+    keyset = ''
+    if cursor:
+        last_rank, last_kind, last_id = decode_cursor(cursor)
+        keyset = 'WHERE (hits.rank, hits.type, hits.id) < (%s::real, %s, %s)'
+        values.extend([last_rank, last_kind, last_id])
+    values.append(page_size + 1)
+
+    cur.execute(f'''
+        WITH q AS (SELECT to_tsquery('russian', %s) as query)
+        SELECT page.type, page.id, page.title, page.excerpt, page.image_url, page.date, page.rank,
+               ts_headline('russian', page.title, q.query, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') as title_highlight,
+               ts_headline('russian',
+                           regexp_replace(COALESCE(NULLIF(page.content, ''), page.excerpt, ''), '<[^>]+>', ' ', 'g'),
+                           q.query, '{HEADLINE_OPTIONS}') as snippet
+        FROM (
+            SELECT * FROM ({union}) hits
+            {keyset}
+            ORDER BY hits.rank DESC, hits.type DESC, hits.id DESC
+            LIMIT %s
+        ) page, q
+        ORDER BY page.rank DESC, page.type DESC, page.id DESC
+    ''', values)
+    rows = RowEncoder(cur.description).rows(cur.fetchall())
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['rank'], last['type'], last['id'])
+
+    for item in rows:
+        item['url'] = URL_PATTERNS[item['type']].format(id=item['id'])
+    return rows, next_cursor
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Full-text search over news, city places and memory articles
+    Args: event with httpMethod, queryStringParameters (q, type=news|places|memory|all,
+          prefix=true|all for typeahead, limit, cursor)
+          context with request_id
+    Returns: HTTP response with ranked, highlighted results and next_cursor
+    '''
+    method: str = event.get('httpMethod', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    if method != 'GET':
+        return {
+            'statusCode': 405,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+    
+    params = event.get('queryStringParameters') or {}
+    query_text = params.get('q', '').strip()
+    kind = params.get('type', 'all')
+    prefix_param = params.get('prefix', 'false').lower()
+    prefix = 'all' if prefix_param == 'all' else prefix_param == 'true'
+    
+    if kind == 'all':
+        kinds = list(SEARCH_SOURCES)
+    elif kind in SEARCH_SOURCES:
+        kinds = [kind]
+    else:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Unknown type'}),
+            'isBase64Encoded': False
+        }
+    
+    tsquery = build_tsquery(query_text, prefix)
+    if not tsquery:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Query parameter q required'}),
+            'isBase64Encoded': False
+        }
+    
+    try:
+        page_size = min(max(int(params.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_PAGE_MAX)
+    except ValueError:
+        page_size = SEARCH_PAGE_SIZE
+    
+    dsn = os.environ.get('DATABASE_URL', '')
+    
+    if not dsn:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Database not configured'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = get_connection(dsn)
+    
+    try:
+        with conn.cursor() as cur:
+            try:
+                items, next_cursor = search(cur, tsquery, kinds, params.get('cursor'), page_size)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'error': str(e)}),
+                    'isBase64Encoded': False
+                }
+        
+        return compress_response(event, {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Cache-Control': 'public, max-age=60, stale-while-revalidate=300'
+            },
+            'body': dumps({'items': items, 'next_cursor': next_cursor}),
+            'isBase64Encoded': False
+        })
+    
+    finally:
+        conn.close()
@@ -1,5 +1,6 @@
 import json
-import psycopg2
+from db_pool import get_connection
+from compression import compress_response
 from datetime import datetime
 from typing import Dict, Any
 import os
@@ -40,7 +41,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Database connection not configured'})
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     cur = conn.cursor()
     
     cur.execute("SELECT id, updated_at FROM news WHERE status = 'published' ORDER BY published_at DESC")
@@ -149,12 +150,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
 </urlset>'''
     
-    return {
+    return compress_response(event, {
         'statusCode': 200,
         'headers': {
             'Content-Type': 'application/xml; charset=utf-8',
-            'Access-Control-Allow-Origin': '*'
+            'Access-Control-Allow-Origin': '*',
+            'Cache-Control': 'public, max-age=3600'
         },
         'isBase64Encoded': False,
         'body': sitemap_xml
-    }
\ No newline at end of file
+    })
\ No newline at end of file
@@ -3,14 +3,48 @@ import os
 import urllib.request
 import urllib.parse
 import urllib.error
-import re
-import html
-from typing import Dict, Any, Optional, List
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, List, Callable, Tuple
+import psycopg2
+from db_pool import get_connection
+from outbox import enqueue, drain_outbox, RESULT_ID_KEYS, TRANSIENT_EXCEPTIONS
+from media_cache import MEDIA_CACHE, DOWNLOAD_TIMEOUT, fit_for_network, get_media_id, remember_media_id, forget_media_id, multipart_body
+from plain_text import html_to_text
+from vk_cache import UPLOAD_SERVERS, VK_STALE_UPLOAD_ERRORS, choose_vk_token, reject_vk_token, vk_token_rejected
+
+TELEGRAM_API_TIMEOUT = 10
+TELEGRAM_UPLOAD_TIMEOUT = 20
+
+# Per-network wall-clock budgets. The VK photo path chains four requests with
+# 15s timeouts. A Telegram photo post downloads the image through the media
+# cache, may try a remembered file_id first and then uploads the bytes; its
+# budget covers all three timeouts, so a slow post that still succeeds is
+# never reported as timed out (and then posted twice by a retry).
+PUBLISH_DEADLINES: Dict[str, float] = {
+    'vk': float(os.environ.get('VK_PUBLISH_DEADLINE', '40')),
+    'telegram': float(os.environ.get(
+        'TELEGRAM_PUBLISH_DEADLINE',
+        str(DOWNLOAD_TIMEOUT + TELEGRAM_API_TIMEOUT + TELEGRAM_UPLOAD_TIMEOUT + 5)
+    ))
+}
+
+# Shared across warm invocations. A publisher that overran its deadline keeps
+# its worker until urlopen gives up, so the pool is sized for one stuck call
+# per network on top of a running request.
+PUBLISH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='publish')
+
+# wall.post "invalid parameter": a remembered photo attachment no longer exists
+VK_STALE_ATTACHMENT_ERRORS = {100}
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: Publishes news to VK and Telegram social networks
-    Args: event - dict with httpMethod, body containing news data
+    Business: Publishes news to VK and Telegram social networks. With a database
+              the post is queued in the social_outbox and ?action=drain (called
+              by the scheduler) publishes it with retries; "sync": true or no
+              DATABASE_URL publishes at once, both networks concurrently
+    Args: event - dict with httpMethod, queryStringParameters (action=drain),
+          body containing news data (news_id, idempotency_key optional)
           context - object with request_id and other metadata
     Returns: HTTP response with publication results
     '''
@@ -35,6 +69,36 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Method not allowed'})
         }
     
+    params = event.get('queryStringParameters') or {}
+    dsn = os.environ.get('DATABASE_URL', '')
+    
+    if params.get('action') == 'drain':
+        if not dsn:
+            return {
+                'statusCode': 500,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Database not configured'})
+            }
+        
+        conn = get_connection(dsn)
+        try:
+            summary = drain_outbox(conn, {
+                'vk': lambda payload: publish_to_vk(**payload),
+                'telegram': lambda payload: publish_to_telegram(**payload)
+            })
+        finally:
+            conn.close()
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'isBase64Encoded': False,
+            'body': json.dumps({'success': True, **summary})
+        }
+    
     body_data = json.loads(event.get('body', '{}'))
     
     title: str = body_data.get('title', '')
@@ -77,13 +141,61 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             })
         }
     
+    networks = [network for network, enabled in (('vk', publish_vk), ('telegram', publish_telegram)) if enabled]
+    if dsn and networks and not body_data.get('sync', False):
+        payload = {'title': title, 'excerpt': excerpt, 'image_url': image_url, 'news_url': news_url, 'keywords': keywords}
+        news_id = body_data.get('news_id')
+        try:
+            conn = get_connection(dsn)
+            try:
+                jobs = enqueue(conn, news_id if isinstance(news_id, int) else None, payload, networks,
+                               body_data.get('idempotency_key'))
+            finally:
+                conn.close()
+        except psycopg2.Error as e:
+            print(f'Outbox unavailable, publishing directly: {str(e)}')
+            jobs = None
+        
+        if jobs is not None:
+            for network, job in jobs.items():
+                results[network] = {
+                    'success': job['status'] == 'sent',
+                    'error': None,
+                    RESULT_ID_KEYS[network]: job['external_id'],
+                    'queued': job['status'] in ('pending', 'processing'),
+                    'job_id': job['job_id'],
+                    'status': job['status'],
+                    'duplicate': job['duplicate']
+                }
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'isBase64Encoded': False,
+                'body': json.dumps({
+                    'success': True,
+                    'queued': True,
+                    'results': results,
+                    'published_count': sum(1 for job in jobs.values() if job['status'] == 'sent' and not job['duplicate']),
+                    'queued_count': sum(1 for job in jobs.values() if not job['duplicate']),
+                    # Jobs that already existed under the same idempotency key: nothing new was queued
+                    'duplicate_count': sum(1 for job in jobs.values() if job['duplicate']),
+                    'already_sent': [network for network, job in jobs.items() if job['duplicate'] and job['status'] == 'sent'],
+                    'already_queued': [network for network, job in jobs.items()
+                                       if job['duplicate'] and job['status'] in ('pending', 'processing')]
+                })
+            }
+    
+    publishers: Dict[str, Callable[[], Dict[str, Any]]] = {}
     if publish_vk:
-        vk_result = publish_to_vk(title, excerpt, image_url, news_url, keywords)
-        results['vk'] = vk_result
-    
+        publishers['vk'] = lambda: publish_to_vk(title, excerpt, image_url, news_url, keywords)
     if publish_telegram:
-        tg_result = publish_to_telegram(title, excerpt, image_url, news_url, keywords)
-        results['telegram'] = tg_result
+        publishers['telegram'] = lambda: publish_to_telegram(title, excerpt, image_url, news_url, keywords)
+    
+    results.update(run_publishers(publishers))
     
     success_count = sum(1 for r in results.values() if r['success'])
     
@@ -102,40 +214,50 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
 
 
-def clean_html(text: str) -> str:
-    '''Remove HTML tags and convert to plain text'''
-    text = html.unescape(text)
-    text = re.sub(r'<img[^>]*>', '', text)
-    text = re.sub(r'<br\s*/?>', '\n', text)
-    text = re.sub(r'<strong>(.*?)</strong>', r'\1', text, flags=re.DOTALL)
-    text = re.sub(r'<b>(.*?)</b>', r'\1', text, flags=re.DOTALL)
-    text = re.sub(r'<em>(.*?)</em>', r'\1', text, flags=re.DOTALL)
-    text = re.sub(r'<i>(.*?)</i>', r'\1', text, flags=re.DOTALL)
-    text = re.sub(r'<a[^>]*>(.*?)</a>', r'\1', text, flags=re.DOTALL)
-    text = re.sub(r'<li[^>]*>(.*?)</li>', r'• \1\n', text, flags=re.DOTALL)
-    text = re.sub(r'<h[1-6][^>]*>(.*?)</h[1-6]>', r'\1\n\n', text, flags=re.DOTALL)
-    text = re.sub(r'<blockquote[^>]*>(.*?)</blockquote>', r'"\1"\n\n', text, flags=re.DOTALL)
-    text = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', text, flags=re.DOTALL)
-    text = re.sub(r'<ul[^>]*>|</ul>|<ol[^>]*>|</ol>', '\n', text)
-    text = re.sub(r'<[^>]+>', '', text)
-    text = re.sub(r'\u00a0|\u202f|\u2009', ' ', text)
-    text = re.sub(r'\u2011|\u2012|\u2013|\u2014|\u2015', '-', text)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r' {2,}', ' ', text)
-    return text.strip()
-
-def clean_markdown(text: str) -> str:
-    '''Remove markdown syntax from text'''
-    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    text = re.sub(r'[#*_`~]', '', text)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    return text.strip()
+def run_publishers(publishers: Dict[str, Callable[[], Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    '''
+    Run the per-network publishers concurrently and collect whatever finished
+    within each network's deadline. A network that overruns is reported as
+    failed with timed_out set; the others keep their own results.
+    '''
+    started = time.monotonic()
+    
+    def timed(publish: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        result = publish()
+        return {**result, 'elapsed_ms': int((time.monotonic() - started) * 1000)}
+    
+    futures = {network: PUBLISH_EXECUTOR.submit(timed, publish) for network, publish in publishers.items()}
+    results: Dict[str, Dict[str, Any]] = {}
+    
+    for network in sorted(futures, key=lambda name: PUBLISH_DEADLINES.get(name, 30.0)):
+        future = futures[network]
+        deadline = PUBLISH_DEADLINES.get(network, 30.0)
+        wait([future], timeout=max(0.0, started + deadline - time.monotonic()))
+        id_key = 'post_id' if network == 'vk' else 'message_id'
+        
+        if not future.done():
+            print(f'{network} publish exceeded {deadline:.0f}s deadline')
+            results[network] = {
+                'success': False,
+                'error': f'Timed out after {deadline:.0f}s, the post may still appear',
+                id_key: None,
+                'timed_out': True,
+                'elapsed_ms': int((time.monotonic() - started) * 1000)
+            }
+            continue
+        
+        try:
+            results[network] = future.result()
+        except Exception as e:
+            print(f'{network} publish exception: {str(e)}')
+            results[network] = {'success': False, 'error': str(e), id_key: None}
+    
+    return results
+
 
 def truncate_text(text: str, max_length: int = 800, add_read_more: bool = False, news_url: Optional[str] = None) -> str:
     '''Truncate text to max length, keeping whole words'''
-    text = clean_html(text)
-    text = clean_markdown(text)
+    text = html_to_text(text)
     if len(text) <= max_length:
         return text
     
@@ -169,7 +291,7 @@ def publish_to_vk(title: str, excerpt: str, image_url: Optional[str], news_url:
             'post_id': None
         }
     
-    access_token = user_token if user_token and image_url else group_token
+    access_token, with_photo = choose_vk_token(group_token, user_token, bool(image_url))
     
     vk_max_length = 1000
     title_and_newline_length = len(title) + 2
@@ -211,11 +333,46 @@ def publish_to_vk(title: str, excerpt: str, image_url: Optional[str], news_url:
         'v': '5.131'
     }
     
-    if image_url:
-        photo_data = upload_photo_to_vk_user_token(image_url, access_token, group_id)
-        if photo_data:
-            params['attachments'] = photo_data
-    
+    return post_to_vk_wall(params, image_url if with_photo else None, access_token, group_id, group_token)
+
+
+def post_to_vk_wall(params: Dict[str, str], image_url: Optional[str], access_token: str, group_id: str,
+                    group_token: str) -> Dict[str, Any]:
+    '''
+    wall.post with the article photo attached. The photo comes from the shared
+    media cache and is uploaded to VK once per image; a remembered attachment
+    that VK rejects is forgotten and the photo is uploaded again, once. If VK
+    reports the upload token as expired the post goes out with the group token.
+    '''
+    image = MEDIA_CACHE.get(image_url) if image_url and image_url.startswith('http') else None
+    if image is None:
+        if image_url:
+            print(f'Posting to VK without photo, image unavailable: {image_url}')
+        return vk_wall_post(params)
+    
+    digest, image_data = image
+    attachment = get_media_id(digest, 'vk', group_id)
+    reused = attachment is not None
+    if attachment is None:
+        attachment = upload_photo_to_vk_user_token(fit_for_network(digest, image_data, 'vk'), access_token, group_id)
+        if attachment:
+            remember_media_id(digest, 'vk', group_id, attachment)
+        elif vk_token_rejected(access_token):
+            params = {**params, 'access_token': group_token}
+    
+    result = vk_wall_post({**params, 'attachments': attachment} if attachment else params)
+    if reused and not result['success'] and result.get('error_code') in VK_STALE_ATTACHMENT_ERRORS:
+        print(f'VK rejected cached attachment {attachment}, uploading again')
+        forget_media_id(digest, 'vk', group_id)
+        attachment = upload_photo_to_vk_user_token(fit_for_network(digest, image_data, 'vk'), access_token, group_id)
+        if attachment:
+            remember_media_id(digest, 'vk', group_id, attachment)
+        result = vk_wall_post({**params, 'attachments': attachment} if attachment else params)
+    return result
+
+
+def vk_wall_post(params: Dict[str, str]) -> Dict[str, Any]:
+    '''Single wall.post call'''
     url = 'https://api.vk.com/method/wall.post'
     
     try:
@@ -235,6 +392,7 @@ def publish_to_vk(title: str, excerpt: str, image_url: Optional[str], news_url:
                 return {
                     'success': False,
                     'error': result['error'].get('error_msg', 'Unknown VK error'),
+                    'error_code': result['error'].get('error_code'),
                     'post_id': None
                 }
             else:
@@ -247,17 +405,35 @@ def publish_to_vk(title: str, excerpt: str, image_url: Optional[str], news_url:
         return {
             'success': False,
             'error': str(e),
+            'transient': isinstance(e, TRANSIENT_EXCEPTIONS),
             'post_id': None
         }
 
 
-def upload_photo_to_vk_user_token(image_url: str, access_token: str, group_id: str) -> Optional[str]:
-    '''Upload photo to VK using user token (not group token)'''
+def upload_photo_to_vk_user_token(image_data: bytes, access_token: str, group_id: str) -> Optional[str]:
+    '''
+    Upload photo bytes to VK using user token (not group token). The upload
+    server URL is reused across warm invocations; when VK rejects a cached
+    one it is dropped and the upload is repeated once with a fresh URL.
+    '''
+    upload_url = UPLOAD_SERVERS.get(access_token)
+    if upload_url is not None:
+        attachment, stale = send_photo_to_vk(upload_url, image_data, access_token, group_id)
+        if not stale:
+            return attachment
+        print('Cached VK upload server was rejected, requesting a new one')
+        UPLOAD_SERVERS.invalidate(access_token)
+    
+    upload_url = get_vk_upload_server(access_token)
+    if upload_url is None:
+        return None
+    attachment, _ = send_photo_to_vk(upload_url, image_data, access_token, group_id)
+    return attachment
+
+
+def get_vk_upload_server(access_token: str) -> Optional[str]:
+    '''photos.getWallUploadServer, remembered for VK_UPLOAD_SERVER_TTL'''
     try:
-        if not image_url or not image_url.startswith('http'):
-            print(f'Invalid image URL: {image_url}')
-            return None
-        
         params = {
             'access_token': access_token,
             'v': '5.131'
@@ -272,6 +448,7 @@ def upload_photo_to_vk_user_token(image_url: str, access_token: str, group_id: s
             
             if 'error' in result:
                 print(f'VK getWallUploadServer error: {result["error"]}')
+                reject_vk_token(access_token, result['error'])
                 return None
             
             if 'response' not in result or 'upload_url' not in result['response']:
@@ -280,36 +457,40 @@ def upload_photo_to_vk_user_token(image_url: str, access_token: str, group_id: s
             
             upload_url = result['response']['upload_url']
         
-        image_req = urllib.request.Request(
-            image_url,
-            headers={'User-Agent': 'Mozilla/5.0'}
-        )
-        with urllib.request.urlopen(image_req, timeout=15) as img_response:
-            image_data = img_response.read()
-        
-        if len(image_data) == 0:
-            print('Downloaded image is empty')
-            return None
-        
-        boundary = '----WebKitFormBoundary7MA4YWxkTrZu0gW'
-        body = (
-            f'--{boundary}\r\n'
-            f'Content-Disposition: form-data; name="photo"; filename="image.jpg"\r\n'
-            f'Content-Type: image/jpeg\r\n\r\n'
-        ).encode('utf-8') + image_data + f'\r\n--{boundary}--\r\n'.encode('utf-8')
-        
+        UPLOAD_SERVERS.put(access_token, upload_url)
+        return upload_url
+    except Exception as e:
+        print(f'Photo upload error: {str(e)}')
+        return None
+
+
+def send_photo_to_vk(upload_url: str, image_data: bytes, access_token: str, group_id: str) -> Tuple[Optional[str], bool]:
+    '''
+    Upload to the given server and save the photo. Returns (attachment, stale):
+    stale means the server URL itself was refused and a fresh one may work.
+    '''
+    try:
+        body, content_type = multipart_body('photo', image_data)
         upload_req = urllib.request.Request(
             upload_url,
             data=body,
-            headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
+            headers={'Content-Type': content_type}
         )
         
-        with urllib.request.urlopen(upload_req, timeout=15) as upload_response:
-            upload_result = json.loads(upload_response.read().decode('utf-8'))
-            
-            if 'photo' not in upload_result:
-                print(f'No photo in upload result: {upload_result}')
-                return None
+        try:
+            with urllib.request.urlopen(upload_req, timeout=15) as upload_response:
+                upload_result = json.loads(upload_response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            print(f'VK upload server error: {str(e)}')
+            return None, True
+        
+        if 'error' in upload_result:
+            print(f'VK upload server error: {upload_result["error"]}')
+            return None, True
+        
+        if 'photo' not in upload_result:
+            print(f'No photo in upload result: {upload_result}')
+            return None, False
         
         save_params = {
             'group_id': group_id,
@@ -329,19 +510,21 @@ def upload_photo_to_vk_user_token(image_url: str, access_token: str, group_id: s
             
             if 'error' in save_result:
                 print(f'VK saveWallPhoto error: {save_result["error"]}')
-                return None
+                if reject_vk_token(access_token, save_result['error']):
+                    return None, False
+                return None, save_result['error'].get('error_code') in VK_STALE_UPLOAD_ERRORS
             
             if 'response' in save_result and len(save_result['response']) > 0:
                 photo = save_result['response'][0]
                 attachment = f"photo{photo['owner_id']}_{photo['id']}"
                 print(f'Successfully uploaded photo: {attachment}')
-                return attachment
+                return attachment, False
             
             print(f'No photos in save result: {save_result}')
-            return None
+            return None, False
     except Exception as e:
         print(f'Photo upload error: {str(e)}')
-        return None
+        return None, False
 
 
 def save_vk_draft_post(title: str, excerpt: str, image_url: Optional[str], news_url: Optional[str], keywords: str = '') -> Dict[str, Any]:
@@ -357,7 +540,7 @@ def save_vk_draft_post(title: str, excerpt: str, image_url: Optional[str], news_
             'post_id': None
         }
     
-    access_token = user_token if user_token and image_url else group_token
+    access_token, with_photo = choose_vk_token(group_token, user_token, bool(image_url and user_token))
     
     vk_max_length = 1000
     title_and_newline_length = len(title) + 2
@@ -403,44 +586,7 @@ def save_vk_draft_post(title: str, excerpt: str, image_url: Optional[str], news_
         'v': '5.131'
     }
     
-    if image_url and user_token:
-        photo_data = upload_photo_to_vk_user_token(image_url, access_token, group_id)
-        if photo_data:
-            params['attachments'] = photo_data
-    
-    url = 'https://api.vk.com/method/wall.post'
-    
-    try:
-        data = urllib.parse.urlencode(params).encode('utf-8')
-        req = urllib.request.Request(url, data=data)
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            result = json.loads(response.read().decode('utf-8'))
-            
-            if 'response' in result and 'post_id' in result['response']:
-                return {
-                    'success': True,
-                    'error': None,
-                    'post_id': result['response']['post_id']
-                }
-            elif 'error' in result:
-                return {
-                    'success': False,
-                    'error': result['error'].get('error_msg', 'Unknown VK error'),
-                    'post_id': None
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'Invalid VK API response',
-                    'post_id': None
-                }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'post_id': None
-        }
+    return post_to_vk_wall(params, image_url if with_photo else None, access_token, group_id, group_token)
 
 
 def publish_to_telegram(title: str, excerpt: str, image_url: Optional[str], news_url: Optional[str], keywords: str = '') -> Dict[str, Any]:
@@ -473,45 +619,91 @@ def publish_to_telegram(title: str, excerpt: str, image_url: Optional[str], news
         return send_telegram_message(bot_token, channel_id, caption)
 
 
+def telegram_failure(result: Dict[str, Any]) -> Dict[str, Any]:
+    '''Failure result with the fields the outbox uses to decide on a retry'''
+    return {
+        'success': False,
+        'error': result.get('description', 'Unknown Telegram error'),
+        'error_code': result.get('error_code'),
+        'retry_after': (result.get('parameters') or {}).get('retry_after'),
+        'message_id': None
+    }
+
+
 def send_telegram_photo(bot_token: str, channel_id: str, photo_url: str, caption: str) -> Dict[str, Any]:
-    '''Send photo with caption to Telegram channel'''
+    '''
+    Send photo with caption to Telegram channel. The image comes from the shared
+    media cache and is uploaded once; later posts of the same picture reuse the
+    file_id Telegram returned. If the image cannot be fetched here, Telegram is
+    given the URL as before.
+    '''
+    image = MEDIA_CACHE.get(photo_url) if photo_url.startswith('http') else None
+    if image is None:
+        return telegram_photo_request(bot_token, channel_id, caption, photo=photo_url)
+    
+    digest, image_data = image
+    file_id = get_media_id(digest, 'telegram', channel_id)
+    if file_id:
+        result = telegram_photo_request(bot_token, channel_id, caption, photo=file_id)
+        if result['success'] or 'file' not in (result.get('error') or '').lower():
+            return result
+        forget_media_id(digest, 'telegram', channel_id)
+    
+    result = telegram_photo_request(bot_token, channel_id, caption, image_data=fit_for_network(digest, image_data, 'telegram'))
+    if result.get('file_id'):
+        remember_media_id(digest, 'telegram', channel_id, result['file_id'])
+    return result
+
+
+def telegram_photo_request(bot_token: str, channel_id: str, caption: str, photo: Optional[str] = None,
+                           image_data: Optional[bytes] = None) -> Dict[str, Any]:
+    '''sendPhoto by URL or file_id (photo), or as a multipart upload (image_data)'''
     url = f'https://api.telegram.org/bot{bot_token}/sendPhoto'
     
     params = {
         'chat_id': channel_id,
-        'photo': photo_url,
         'caption': caption,
         'parse_mode': 'HTML'
     }
     
     try:
         print(f'Sending Telegram photo with caption length: {len(caption)}')
-        data = urllib.parse.urlencode(params).encode('utf-8')
-        req = urllib.request.Request(url, data=data)
+        if image_data is not None:
+            data, content_type = multipart_body('photo', image_data, params)
+            req = urllib.request.Request(url, data=data, headers={'Content-Type': content_type})
+        else:
+            data = urllib.parse.urlencode({**params, 'photo': photo}).encode('utf-8')
+            req = urllib.request.Request(url, data=data)
         
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with urllib.request.urlopen(req, timeout=TELEGRAM_UPLOAD_TIMEOUT if image_data is not None else TELEGRAM_API_TIMEOUT) as response:
             result = json.loads(response.read().decode('utf-8'))
             print(f'Telegram photo response: {result}')
             
             if result.get('ok'):
+                sizes = result['result'].get('photo') or []
                 return {
                     'success': True,
                     'error': None,
-                    'message_id': result['result']['message_id']
+                    'message_id': result['result']['message_id'],
+                    'file_id': sizes[-1]['file_id'] if sizes else None
                 }
             else:
-                error_msg = result.get('description', 'Unknown Telegram error')
-                print(f'Telegram photo error: {error_msg}')
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'message_id': None
-                }
+                print(f'Telegram photo error: {result}')
+                return telegram_failure(result)
+    except urllib.error.HTTPError as e:
+        # 429 and other API errors come back as HTTP errors with a JSON body
+        try:
+            result = json.loads(e.read().decode('utf-8'))
+        except ValueError:
+            result = {'description': str(e), 'error_code': e.code}
+        print(f'Telegram photo error: {result}')
+        return telegram_failure(result)
     except Exception as e:
         print(f'Telegram photo exception: {str(e)}')
         return {
             'success': False,
             'error': str(e),
+            'transient': isinstance(e, TRANSIENT_EXCEPTIONS),
             'message_id': None
         }
 
@@ -531,7 +723,7 @@ def send_telegram_message(bot_token: str, channel_id: str, text: str) -> Dict[st
         data = urllib.parse.urlencode(params).encode('utf-8')
         req = urllib.request.Request(url, data=data)
         
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with urllib.request.urlopen(req, timeout=TELEGRAM_API_TIMEOUT) as response:
             result = json.loads(response.read().decode('utf-8'))
             print(f'Telegram message response: {result}')
             
@@ -542,17 +734,21 @@ def send_telegram_message(bot_token: str, channel_id: str, text: str) -> Dict[st
                     'message_id': result['result']['message_id']
                 }
             else:
-                error_msg = result.get('description', 'Unknown Telegram error')
-                print(f'Telegram message error: {error_msg}')
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'message_id': None
-                }
+                print(f'Telegram message error: {result}')
+                return telegram_failure(result)
+    except urllib.error.HTTPError as e:
+        # 429 and other API errors come back as HTTP errors with a JSON body
+        try:
+            result = json.loads(e.read().decode('utf-8'))
+        except ValueError:
+            result = {'description': str(e), 'error_code': e.code}
+        print(f'Telegram message error: {result}')
+        return telegram_failure(result)
     except Exception as e:
         print(f'Telegram message exception: {str(e)}')
         return {
             'success': False,
             'error': str(e),
+            'transient': isinstance(e, TRANSIENT_EXCEPTIONS),
             'message_id': None
         }
\ No newline at end of file
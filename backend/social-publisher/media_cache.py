@@ -0,0 +1,347 @@
+'''
+Shared cache of article images for the social publishers.
+
+An image is downloaded once per URL and kept by content hash: the bytes sit in
+an in-memory LRU bounded by MEDIA_CACHE_MAX_BYTES and spill to MEDIA_SPILL_DIR
+under /tmp when evicted, so a warm instance reuses them across invocations.
+Concurrent publishers asking for the same URL share one download. After
+MEDIA_URL_TTL seconds a URL is revalidated with a conditional GET.
+
+Each network gets the bytes scaled down to its limits when Pillow is
+installed (the original is used otherwise). Whatever the network returns for
+an uploaded image (VK photo attachment, Telegram file_id) is remembered per
+content hash in social_media_ids, so publishing the same picture again skips
+the upload altogether.
+'''
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from db_pool import get_connection
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+MEDIA_SPILL_DIR = os.environ.get('MEDIA_SPILL_DIR', '/tmp/social-media')
+MEDIA_SPILL_MAX_BYTES = int(os.environ.get('MEDIA_SPILL_MAX_BYTES', str(256 * 1024 * 1024)))
+MEDIA_URL_TTL = float(os.environ.get('MEDIA_URL_TTL', '600'))
+MEDIA_MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 15
+
+# Upload limits: file size and the sum of width and height
+NETWORK_LIMITS: Dict[str, Dict[str, int]] = {
+    'vk': {'max_bytes': 50 * 1024 * 1024, 'max_side_sum': 14000},
+    'telegram': {'max_bytes': 10 * 1024 * 1024, 'max_side_sum': 10000}
+}
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', 'png'),
+    (b'GIF8', 'image/gif', 'gif'),
+    (b'RIFF', 'image/webp', 'webp')
+)
+
+
+def image_type(data: bytes) -> Tuple[str, str]:
+    '''(content type, file extension) sniffed from the first bytes'''
+    for signature, content_type, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type, extension
+    return 'image/jpeg', 'jpg'
+
+
+def multipart_body(field: str, data: bytes, extra: Optional[Dict[str, str]] = None) -> Tuple[bytes, str]:
+    '''Encode one file field (plus plain fields) as multipart/form-data'''
+    boundary = f'----MediaBoundary{uuid.uuid4().hex}'
+    content_type, extension = image_type(data)
+    parts = []
+    for name, value in (extra or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        )
+    parts.append((
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="image.{extension}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode('utf-8') + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class MediaCache:
+    '''URL -> content hash index over a byte-bounded LRU with a /tmp spill'''
+
+    def __init__(self, max_bytes: int = MEDIA_CACHE_MAX_BYTES, spill_dir: str = MEDIA_SPILL_DIR,
+                 spill_max_bytes: int = MEDIA_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        # url -> {'digest', 'checked_at', 'etag', 'last_modified'}
+        self._urls: Dict[str, Dict[str, Any]] = {}
+        self._blobs: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # url -> [download lock, threads holding or waiting for it]
+        self._inflight: Dict[str, List[Any]] = {}
+        self.stats: Dict[str, int] = {'hits': 0, 'downloads': 0, 'revalidated': 0, 'spill_reads': 0}
+
+    def get(self, url: str) -> Optional[Tuple[str, bytes]]:
+        '''(sha256 hex, bytes) of the image at url, downloading at most once'''
+        with self._lock:
+            inflight = self._inflight.setdefault(url, [threading.Lock(), 0])
+            inflight[1] += 1
+        try:
+            with inflight[0]:
+                entry = self._urls.get(url)
+                if entry and time.monotonic() - entry['checked_at'] < MEDIA_URL_TTL:
+                    data = self.load(entry['digest'])
+                    if data is not None:
+                        self.stats['hits'] += 1
+                        return entry['digest'], data
+                    entry = None
+                return self.download(url, entry)
+        finally:
+            # The last thread out drops the lock so the dict holds only URLs in flight
+            with self._lock:
+                inflight[1] -= 1
+                if not inflight[1]:
+                    del self._inflight[url]
+
+    def download(self, url: str, entry: Optional[Dict[str, Any]]) -> Optional[Tuple[str, bytes]]:
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=DOWNLOAD_TIMEOUT) as response:
+                data = response.read(MEDIA_MAX_DOWNLOAD_BYTES + 1)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry:
+                data = self.load(entry['digest'])
+                if data is not None:
+                    entry['checked_at'] = time.monotonic()
+                    self.stats['revalidated'] += 1
+                    return entry['digest'], data
+            print(f'Image download failed: {str(e)}')
+            return None
+        except Exception as e:
+            print(f'Image download failed: {str(e)}')
+            return None
+
+        if not data or len(data) > MEDIA_MAX_DOWNLOAD_BYTES:
+            print(f'Image is empty or too large: {url}')
+            return None
+
+        self.stats['downloads'] += 1
+        digest = hashlib.sha256(data).hexdigest()
+        self.store(digest, data)
+        self._urls[url] = {'digest': digest, 'checked_at': time.monotonic(), 'etag': etag, 'last_modified': last_modified}
+        return digest, data
+
+    def store(self, digest: str, data: bytes):
+        spilled = []
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return
+            self._blobs[digest] = data
+            self._bytes += len(data)
+            while len(self._blobs) > 1 and self._bytes > self.max_bytes:
+                evicted_digest, evicted = self._blobs.popitem(last=False)
+                self._bytes -= len(evicted)
+                spilled.append((evicted_digest, evicted))
+        for evicted_digest, evicted in spilled:
+            self.spill(evicted_digest, evicted)
+
+    def load(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._blobs.get(digest)
+            if data is not None:
+                self._blobs.move_to_end(digest)
+                return data
+        try:
+            with open(os.path.join(self.spill_dir, digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.stats['spill_reads'] += 1
+        self.store(digest, data)
+        return data
+
+    def spill(self, digest: str, data: bytes):
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, digest)
+            if not os.path.exists(path):
+                temp_path = f'{path}.{uuid.uuid4().hex[:8]}'
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            self.trim_spill()
+        except OSError as e:
+            print(f'Media spill failed: {str(e)}')
+
+    def trim_spill(self):
+        '''Drop the least recently written files beyond spill_max_bytes'''
+        files = []
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'urls': len(self._urls), 'entries': len(self._blobs), 'bytes': self._bytes, **self.stats}
+
+
+MEDIA_CACHE = MediaCache()
+_variants: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+_variants_lock = threading.Lock()
+MAX_VARIANTS = 32
+
+
+def fit_for_network(digest: str, data: bytes, network: str) -> bytes:
+    '''
+    Scale the image down to the network's limits. The original bytes are
+    returned when they already fit or Pillow is not available.
+    '''
+    limits = NETWORK_LIMITS[network]
+    if Image is None:
+        return data
+    with _variants_lock:
+        cached = _variants.get((digest, network))
+    if cached is not None:
+        return cached
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if len(data) <= limits['max_bytes'] and width + height <= limits['max_side_sum']:
+                return data
+            scale = min(1.0, limits['max_side_sum'] / float(width + height))
+            result = data
+            for quality in (90, 80, 70):
+                resized = image.convert('RGB').resize((max(1, int(width * scale)), max(1, int(height * scale))))
+                buffer = io.BytesIO()
+                resized.save(buffer, format='JPEG', quality=quality)
+                result = buffer.getvalue()
+                if len(result) <= limits['max_bytes']:
+                    break
+                scale *= 0.75
+    except Exception as e:
+        print(f'Image resize failed, sending original: {str(e)}')
+        return data
+
+    with _variants_lock:
+        _variants[(digest, network)] = result
+        while len(_variants) > MAX_VARIANTS:
+            _variants.popitem(last=False)
+    return result
+
+
+_media_ids: Dict[Tuple[str, str, str], str] = {}
+
+
+def get_media_id(digest: str, network: str, target: str) -> Optional[str]:
+    '''Attachment or file id a network returned for this image, if any'''
+    key = (digest, network, target)
+    if key in _media_ids:
+        return _media_ids[key]
+    conn = media_db()
+    if conn is None:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                SELECT media_id FROM social_media_ids
+                WHERE content_hash = %s AND network = %s AND target = %s
+            ''', key)
+            row = cur.fetchone()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f'Media id lookup failed: {str(e)}')
+        return None
+    finally:
+        conn.close()
+    if row:
+        _media_ids[key] = row[0]
+        return row[0]
+    return None
+
+
+def remember_media_id(digest: str, network: str, target: str, media_id: str):
+    _media_ids[(digest, network, target)] = media_id
+    conn = media_db()
+    if conn is None:
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                INSERT INTO social_media_ids (content_hash, network, target, media_id)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (content_hash, network, target)
+                DO UPDATE SET media_id = EXCLUDED.media_id, created_at = CURRENT_TIMESTAMP
+            ''', (digest, network, target, media_id))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f'Media id save failed: {str(e)}')
+    finally:
+        conn.close()
+
+
+def forget_media_id(digest: str, network: str, target: str):
+    '''Called when the network no longer accepts a remembered id'''
+    _media_ids.pop((digest, network, target), None)
+    conn = media_db()
+    if conn is None:
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                DELETE FROM social_media_ids
+                WHERE content_hash = %s AND network = %s AND target = %s
+            ''', (digest, network, target))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f'Media id delete failed: {str(e)}')
+    finally:
+        conn.close()
+
+
+def media_db():
+    dsn = os.environ.get('DATABASE_URL', '')
+    if not dsn:
+        return None
+    try:
+        return get_connection(dsn)
+    except Exception as e:
+        print(f'Media id store unavailable: {str(e)}')
+        return None
@@ -0,0 +1,259 @@
+'''
+Durable outbox for social publications.
+
+Publishing an article enqueues one social_outbox row per network, keyed by an
+idempotency key, and returns at once. drain_outbox() is the worker: it claims
+due jobs one at a time (FOR UPDATE SKIP LOCKED, so concurrent drains never
+take the same job), waits for the network's rate-limit slot, calls the
+publisher and records the attempt. Failures that may pass (network errors,
+VK flood control, Telegram 429 and 5xx) are retried with exponential backoff
+and jitter; any other failure, such as missing credentials, fails the job
+at once. Telegram retry_after overrides the backoff and also holds back
+every other job for that network. A job stuck in 'processing' after a crashed
+drain is picked up again once its lock expires.
+
+The rate-limit slots live in social_rate_limits (one row per network, seeded by
+the migration) so that the scheduler's drain and an editor-triggered drain
+share one budget per network.
+'''
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+OUTBOX_NETWORKS = ('vk', 'telegram')
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BASE_BACKOFF = float(os.environ.get('OUTBOX_BASE_BACKOFF', '30'))
+OUTBOX_MAX_BACKOFF = float(os.environ.get('OUTBOX_MAX_BACKOFF', '3600'))
+OUTBOX_DRAIN_BUDGET = float(os.environ.get('OUTBOX_DRAIN_BUDGET', '25'))
+# Longer than the slowest publisher (the VK photo path chains five 10-15s calls)
+OUTBOX_LOCK_SECONDS = 120
+# Minimal spacing between calls: Telegram allows about 20 posts a minute to one
+# channel, VK wall.post is limited per second and by flood control
+RATE_INTERVALS: Dict[str, float] = {
+    'vk': float(os.environ.get('VK_MIN_INTERVAL', '1')),
+    'telegram': float(os.environ.get('TELEGRAM_MIN_INTERVAL', '3'))
+}
+# 1 unknown, 6 too many requests per second, 9 flood control, 10 internal, 29 rate limit
+VK_RETRYABLE_ERRORS = {1, 6, 9, 10, 29}
+# Connection refused, DNS failures and timeouts are all OSError subclasses
+TRANSIENT_EXCEPTIONS = (OSError,)
+RESULT_ID_KEYS = {'vk': 'post_id', 'telegram': 'message_id'}
+
+
+def idempotency_key(network: str, payload: Dict[str, Any], explicit: Optional[str] = None) -> str:
+    '''Same article (by its URL, else its title) to the same network gives the same key'''
+    source = explicit or payload.get('news_url') or payload.get('title') or ''
+    return hashlib.sha256(f'{network}:{source}'.encode('utf-8')).hexdigest()
+
+
+def enqueue(conn, news_id: Optional[int], payload: Dict[str, Any], networks: List[str],
+            explicit_key: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    '''
+    Create one job per network. A job whose key already exists is returned
+    as is with duplicate=True, so a second click never posts twice; only a
+    job that has given up (failed) is re-armed with the new payload, and
+    counts as newly queued.
+    '''
+    jobs: Dict[str, Dict[str, Any]] = {}
+    with conn.cursor() as cur:
+        for network in networks:
+            key = idempotency_key(network, payload, explicit_key)
+            cur.execute('''
+                INSERT INTO social_outbox (news_id, network, idempotency_key, payload)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (idempotency_key) DO UPDATE
+                SET payload = EXCLUDED.payload, status = 'pending', attempts = 0, last_error = NULL,
+                    next_attempt_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE social_outbox.status = 'failed'
+                RETURNING id, status, external_id
+            ''', (news_id, network, key, json.dumps(payload, ensure_ascii=False)))
+            row = cur.fetchone()
+            duplicate = row is None
+            if duplicate:
+                cur.execute('''
+                    SELECT id, status, external_id
+                    FROM social_outbox
+                    WHERE idempotency_key = %s
+                ''', (key,))
+                row = cur.fetchone()
+            jobs[network] = {'job_id': row[0], 'status': row[1], 'external_id': row[2], 'duplicate': duplicate}
+    conn.commit()
+    return jobs
+
+
+def claim_job(conn) -> Optional[Dict[str, Any]]:
+    with conn.cursor() as cur:
+        cur.execute('''
+            UPDATE social_outbox
+            SET status = 'processing',
+                attempts = attempts + 1,
+                locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM social_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                   OR (status = 'processing' AND locked_until < CURRENT_TIMESTAMP)
+                ORDER BY next_attempt_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, network, payload, attempts
+        ''', (OUTBOX_LOCK_SECONDS,))
+        row = cur.fetchone()
+    conn.commit()
+    if row is None:
+        return None
+    return {'id': row[0], 'network': row[1], 'payload': row[2], 'attempts': row[3]}
+
+
+def reserve_slot(conn, network: str, max_wait: float) -> Tuple[bool, float]:
+    '''
+    Take the network's next call slot if it opens within max_wait seconds.
+    Returns (reserved, seconds until the slot); a slot that is too far away
+    is left for the next drain instead of being burnt.
+    '''
+    interval = RATE_INTERVALS.get(network, 1.0)
+    with conn.cursor() as cur:
+        cur.execute('''
+            UPDATE social_rate_limits
+            SET next_allowed_at = GREATEST(next_allowed_at, clock_timestamp()::timestamp)
+                                  + make_interval(secs => %s)
+            WHERE network = %s
+              AND next_allowed_at <= clock_timestamp()::timestamp + make_interval(secs => %s)
+            RETURNING EXTRACT(EPOCH FROM next_allowed_at - clock_timestamp()::timestamp) - %s
+        ''', (interval, network, max_wait, interval))
+        row = cur.fetchone()
+        reserved = row is not None
+        if not reserved:
+            cur.execute('''
+                SELECT EXTRACT(EPOCH FROM next_allowed_at - clock_timestamp()::timestamp)
+                FROM social_rate_limits
+                WHERE network = %s
+            ''', (network,))
+            row = cur.fetchone()
+    conn.commit()
+    return reserved, max(0.0, float(row[0])) if row else 0.0
+
+
+def defer_job(conn, job: Dict[str, Any], seconds: float):
+    '''Put a claimed job back without counting an attempt'''
+    with conn.cursor() as cur:
+        cur.execute('''
+            UPDATE social_outbox
+            SET status = 'pending', attempts = attempts - 1, locked_until = NULL,
+                next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        ''', (seconds, job['id']))
+    conn.commit()
+
+
+def is_retryable(network: str, result: Dict[str, Any]) -> bool:
+    '''
+    Only failures known to pass are retried: retry_after, a rate-limit or
+    server error code, or a network error (transient). A failure without a
+    code, such as missing credentials, would fail the same way every time.
+    '''
+    if result.get('retry_after') or result.get('transient'):
+        return True
+    code = result.get('error_code')
+    if code is None:
+        return False
+    if network == 'telegram':
+        return code == 429 or code >= 500
+    return code in VK_RETRYABLE_ERRORS
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def record_attempt(conn, job: Dict[str, Any], result: Dict[str, Any], started_at: datetime,
+                   duration_ms: int) -> str:
+    '''Log the attempt and move the job to sent, pending (retry) or failed'''
+    network = job['network']
+    retry_after = result.get('retry_after')
+    error_code = result.get('error_code')
+    with conn.cursor() as cur:
+        cur.execute('''
+            INSERT INTO social_outbox_attempts (outbox_id, attempt, started_at, duration_ms, success, error, error_code, retry_after)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ''', (job['id'], job['attempts'], started_at, duration_ms, bool(result.get('success')),
+              result.get('error'), error_code if isinstance(error_code, int) else None, retry_after))
+
+        if result.get('success'):
+            status = 'sent'
+            cur.execute('''
+                UPDATE social_outbox
+                SET status = 'sent', external_id = %s, last_error = NULL, locked_until = NULL,
+                    sent_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (str(result.get(RESULT_ID_KEYS[network])), job['id']))
+        elif job['attempts'] < OUTBOX_MAX_ATTEMPTS and is_retryable(network, result):
+            status = 'pending'
+            delay = float(retry_after) + 1 if retry_after else backoff_delay(job['attempts'])
+            cur.execute('''
+                UPDATE social_outbox
+                SET status = 'pending', last_error = %s, locked_until = NULL,
+                    next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (result.get('error'), delay, job['id']))
+        else:
+            status = 'failed'
+            cur.execute('''
+                UPDATE social_outbox
+                SET status = 'failed', last_error = %s, locked_until = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (result.get('error'), job['id']))
+
+        if retry_after:
+            # The limit is per bot/token, not per job
+            cur.execute('''
+                UPDATE social_rate_limits
+                SET next_allowed_at = GREATEST(next_allowed_at, CURRENT_TIMESTAMP + make_interval(secs => %s))
+                WHERE network = %s
+            ''', (float(retry_after), network))
+    conn.commit()
+    return status
+
+
+def drain_outbox(conn, publishers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]],
+                 budget: float = OUTBOX_DRAIN_BUDGET) -> Dict[str, int]:
+    '''
+    Publish due jobs until the queue is empty or the time budget is spent.
+    A job whose rate-limit slot falls after the budget is deferred to that slot.
+    '''
+    started = time.monotonic()
+    summary = {'sent': 0, 'retry': 0, 'failed': 0, 'deferred': 0}
+
+    while time.monotonic() - started < budget:
+        job = claim_job(conn)
+        if job is None:
+            break
+
+        reserved, wait_seconds = reserve_slot(conn, job['network'], budget - (time.monotonic() - started))
+        if not reserved:
+            defer_job(conn, job, wait_seconds)
+            summary['deferred'] += 1
+            continue
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+        attempt_started = datetime.now()
+        try:
+            result = publishers[job['network']](job['payload'])
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'transient': isinstance(e, TRANSIENT_EXCEPTIONS)}
+        duration_ms = int((datetime.now() - attempt_started).total_seconds() * 1000)
+
+        status = record_attempt(conn, job, result, attempt_started, duration_ms)
+        print(f"Outbox job {job['id']} ({job['network']}) attempt {job['attempts']}: {status} {result.get('error') or ''}")
+        summary['sent' if status == 'sent' else 'retry' if status == 'pending' else 'failed'] += 1
+
+    return summary
@@ -0,0 +1,139 @@
+'''
+Plain text for social posts from article HTML (and stray markdown).
+
+Replaces a chain of ~20 re.sub passes, each of which rescanned the whole
+article, with two passes over it:
+
+1. One precompiled pattern splits out the tags. Every opening tag reserves a
+   slot in the output and only block tags fill theirs: a paragraph or heading
+   ends with a blank line, a list item starts with a bullet, a blockquote is
+   wrapped in quotes, <br> and list boundaries become line breaks. As with
+   the old lazy "<p>(.*?)</p>" substitutions, an opening tag counts only when
+   a closing tag follows: a closer pairs with the first opener left since
+   the previous closer of its kind, and unpaired tags are dropped.
+2. One alternation normalizes the text: non-breaking spaces and dashes,
+   runs of spaces and blank lines, markdown images, links and emphasis.
+
+Entities are decoded first and tags are matched case-sensitively up to the
+first ">", as before. A "<" starts a tag only before a tag name, "/" or "!";
+any other "<" (typically a decoded "&lt;") is text, where the old chain
+deleted everything from it to the next ">". Apart from that the output is
+the same as the old clean_html + clean_markdown: tests/test_plain_text.py
+checks it against the previous implementation, and running that file times
+both.
+'''
+import html
+import re
+from typing import Dict, List, Optional, Tuple
+
+# A "<" starts a tag only before a tag name, "/" or "!", and a tag never holds
+# another "<": a literal or decoded "&lt;" in the text ("t < 0") stays text
+# instead of swallowing everything up to the next ">"
+TAG = re.compile(r'(<[A-Za-z/!][^<>]*>)')
+BREAK_TAG = re.compile(r'<br\s*/?>')
+HEADING_OPEN = re.compile(r'<h[1-6]')
+HEADING_CLOSE = re.compile(r'</h[1-6]>')
+
+# kind -> (text in the opener's slot, text for the closer)
+BLOCKS: Dict[str, Tuple[str, str]] = {
+    'li': ('• ', '\n'),
+    'h': ('', '\n\n'),
+    'blockquote': ('"', '"\n\n'),
+    'p': ('', '\n\n')
+}
+CLOSERS = {'</li>': 'li', '</blockquote>': 'blockquote', '</p>': 'p'}
+LIST_BOUNDARIES = ('</ul>', '</ol>')
+TAG_CACHE_MAX = 4096
+
+TEXT = re.compile(
+    # the leading class lets the engine skip plain text without trying each branch
+    r'(?=[!\[ \u00a0\u202f\u2009\n\u2011-\u2015#*_`~])'
+    r'(?:(?P<image>!\[.*?\]\(.*?\))'
+    r'|\[(?P<link>[^\]]+)\]\([^\)]+\)'
+    r'|(?P<spaces>[ \u00a0\u202f\u2009]{2,}|[\u00a0\u202f\u2009])'
+    r'|(?P<breaks>\n(?:[#*_`~]*\n)*)'
+    r'|(?P<dash>[\u2011-\u2015])'
+    r'|[#*_`~])'
+)
+BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def classify(tag: str) -> Tuple[str, Optional[str]]:
+    '''('open' | 'close', kind), ('text', replacement) or ('drop', None)'''
+    if tag[1] == '/':
+        kind = CLOSERS.get(tag) or ('h' if HEADING_CLOSE.fullmatch(tag) else None)
+        if kind:
+            return 'close', kind
+        return ('text', '\n') if tag in LIST_BOUNDARIES else ('drop', None)
+    if BREAK_TAG.fullmatch(tag) or tag.startswith(('<ul', '<ol')):
+        return 'text', '\n'
+    if tag.startswith('<li'):
+        return 'open', 'li'
+    if HEADING_OPEN.match(tag):
+        return 'open', 'h'
+    if tag.startswith('<blockquote'):
+        return 'open', 'blockquote'
+    if tag.startswith('<p'):
+        return 'open', 'p'
+    return 'drop', None
+
+
+_tag_cache: Dict[str, Tuple[str, Optional[str]]] = {}
+
+
+def strip_tags(text: str) -> str:
+    '''Pass 1: tags to line structure'''
+    # split() leaves text at even and tags at odd positions; tags are
+    # replaced in place, openers keep their index until a closer fills it
+    parts = TAG.split(text)
+    pending: Dict[str, List[int]] = {kind: [] for kind in BLOCKS}
+    cache = _tag_cache
+    if len(cache) > TAG_CACHE_MAX:
+        cache.clear()
+    for index in range(1, len(parts), 2):
+        tag = parts[index]
+        action = cache.get(tag)
+        if action is None:
+            action = cache[tag] = classify(tag)
+        role, value = action
+        if role == 'drop':
+            parts[index] = ''
+        elif role == 'text':
+            parts[index] = value
+        elif role == 'open':
+            pending[value].append(index)
+            parts[index] = ''
+        else:
+            openers = pending[value]
+            if openers:
+                prefix, parts[index] = BLOCKS[value]
+                parts[openers[0]] = prefix
+                openers.clear()
+            else:
+                parts[index] = ''
+    return ''.join(parts)
+
+
+def normalize_match(match: 're.Match') -> str:
+    group = match.lastgroup
+    if group == 'spaces':
+        return ' '
+    if group == 'breaks':
+        return '\n\n' if match.group().count('\n') > 1 else '\n'
+    if group == 'dash':
+        return '-'
+    if group == 'link':
+        return TEXT.sub(normalize_match, match.group('link'))
+    return ''
+
+
+def html_to_text(text: str) -> str:
+    '''Article HTML or markdown to the plain text used in VK and Telegram posts'''
+    text = strip_tags(html.unescape(text))
+    text = TEXT.sub(normalize_match, text)
+    if '\n\n\n' in text:
+        # a removed markdown image or a link whose text was only markup can
+        # leave the blank lines around it adjacent
+        text = BLANK_LINES.sub('\n\n', text)
+    return text.strip()
+
@@ -0,0 +1,89 @@
+'''
+Warm-instance cache of VK call metadata for the photo path.
+
+photos.getWallUploadServer returns an upload URL that stays usable for a
+while, so it is kept per token for VK_UPLOAD_SERVER_TTL seconds instead of
+being requested before every photo. A cached URL that the upload or
+photos.saveWallPhoto rejects is dropped, and the caller fetches a new one.
+
+A user token that VK reports as expired or revoked is remembered for
+VK_REJECTED_TOKEN_TTL seconds. Photo posts then go out with the group token
+and no photo instead of failing on every publication until the token is
+replaced in the secrets.
+'''
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+VK_UPLOAD_SERVER_TTL = float(os.environ.get('VK_UPLOAD_SERVER_TTL', '900'))
+VK_REJECTED_TOKEN_TTL = float(os.environ.get('VK_REJECTED_TOKEN_TTL', '3600'))
+# 5 user authorization failed (expired or revoked), 27 method unavailable with
+# group auth, 28 application authorization failed
+VK_EXPIRED_TOKEN_ERRORS = {5, 27, 28}
+# saveWallPhoto: 100 invalid server/photo, 121 invalid hash
+VK_STALE_UPLOAD_ERRORS = {100, 121}
+
+
+class TtlCache:
+    '''Values keyed by token fingerprint that expire after ttl seconds'''
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+    def get(self, token: str) -> Optional[Any]:
+        key = self.fingerprint(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def put(self, token: str, value: Any):
+        with self._lock:
+            self._entries[self.fingerprint(token)] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, token: str):
+        with self._lock:
+            self._entries.pop(self.fingerprint(token), None)
+
+
+UPLOAD_SERVERS = TtlCache(VK_UPLOAD_SERVER_TTL)
+REJECTED_TOKENS = TtlCache(VK_REJECTED_TOKEN_TTL)
+
+
+def choose_vk_token(group_token: str, user_token: Optional[str], with_photo: bool) -> Tuple[str, bool]:
+    '''
+    (token, upload photo) for a wall post. Photos go through the user token
+    when there is one; a token VK has rejected recently is not tried again
+    and the post is made with the group token, without the photo.
+    '''
+    token = user_token or group_token
+    if with_photo and REJECTED_TOKENS.get(token) is None:
+        return token, True
+    return group_token, False
+
+
+def reject_vk_token(token: str, error: Dict[str, Any]) -> bool:
+    '''Remember the token as unusable if the VK error says it has expired'''
+    if error.get('error_code') not in VK_EXPIRED_TOKEN_ERRORS:
+        return False
+    print(f"VK token rejected ({error.get('error_code')}: {error.get('error_msg')}), "
+          f'falling back to the group token for {int(VK_REJECTED_TOKEN_TTL)}s')
+    REJECTED_TOKENS.put(token, True)
+    UPLOAD_SERVERS.invalidate(token)
+    return True
+
+
+def vk_token_rejected(token: str) -> bool:
+    return REJECTED_TOKENS.get(token) is not None
@@ -3,7 +3,7 @@ import os
 from typing import Dict, Any
 import urllib.request
 import urllib.error
-import psycopg2
+from db_pool import get_connection
 from datetime import datetime
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -35,7 +35,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'DATABASE_URL not configured'})
         }
     
-    conn = psycopg2.connect(database_url)
+    conn = get_connection(database_url)
     cursor = conn.cursor()
     
     kudago_url = 'https://kudago.com/public-api/v1.4/events/?location=krd&page_size=10&fields=id,title,description,dates,place,images,is_free,price,age_restriction'
@@ -3,7 +3,7 @@ import os
 from typing import Dict, Any, List
 import urllib.request
 import urllib.parse
-import psycopg2
+from db_pool import get_connection
 from psycopg2.extras import RealDictCursor
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -39,7 +39,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Missing required environment variables'})
         }
     
-    conn = psycopg2.connect(database_url)
+    conn = get_connection(database_url)
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
     cursor.execute('''
@@ -1,5 +1,5 @@
 import json
-import psycopg2
+from db_pool import get_connection
 import urllib.request
 import urllib.parse
 from datetime import datetime
@@ -42,7 +42,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Database connection not configured'})
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     cur = conn.cursor()
     
     cur.execute("SELECT id, updated_at FROM news WHERE status = 'published' ORDER BY published_at DESC")
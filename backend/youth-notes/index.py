@@ -1,6 +1,7 @@
 import json
 import os
-import psycopg2
+from db_pool import get_connection
+from fast_json import RowEncoder, dumps
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 
@@ -34,7 +35,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Database connection not configured'})
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = get_connection(dsn)
     
     if method == 'GET':
         params = event.get('queryStringParameters') or {}
@@ -61,20 +62,22 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                     'isBase64Encoded': False,
-                    'body': json.dumps(dict(result), default=str)
+                    'body': dumps(result)
                 }
             else:
-                cur.execute(
-                    'SELECT * FROM youth_notes ORDER BY created_at DESC'
-                )
-                results = cur.fetchall()
+                # Plain tuples + precomputed column metadata are cheaper than RealDictRow
+                with conn.cursor() as raw_cur:
+                    raw_cur.execute(
+                        'SELECT * FROM youth_notes ORDER BY created_at DESC'
+                    )
+                    results = RowEncoder(raw_cur.description).rows(raw_cur.fetchall())
                 conn.close()
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                     'isBase64Encoded': False,
-                    'body': json.dumps([dict(row) for row in results], default=str)
+                    'body': dumps(results)
                 }
     
     if method == 'POST':
@@ -110,7 +113,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'isBase64Encoded': False,
-                'body': json.dumps(dict(result), default=str)
+                'body': dumps(result)
             }
     
     if method == 'PUT':
@@ -172,7 +175,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'isBase64Encoded': False,
-                'body': json.dumps(dict(result), default=str)
+                'body': dumps(result)
             }
     
     if method == 'DELETE':
@@ -0,0 +1,14 @@
+-- Буфер отложенных счётчиков просмотров и лайков (write-behind).
+-- Каждый просмотр/лайк — это INSERT в эту таблицу вместо UPDATE горячей строки news;
+-- планировщик периодически сворачивает накопленные дельты в news одним UPDATE.
+-- UNLOGGED: таблица не пишется в WAL, при аварийном рестарте БД теряются лишь несвёрнутые дельты.
+CREATE UNLOGGED TABLE IF NOT EXISTS news_counter_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    news_id INTEGER NOT NULL,
+    views_delta INTEGER NOT NULL DEFAULT 0,
+    likes_delta INTEGER NOT NULL DEFAULT 0,
+    ip_address VARCHAR(45),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_news_counter_deltas_news_id ON news_counter_deltas(news_id);
@@ -0,0 +1,11 @@
+-- Отметка «sitemap устарел»: публикация новости лишь выставляет dirty_since,
+-- а планировщик пересобирает sitemap не чаще одного раза за окно SITEMAP_REBUILD_WINDOW.
+CREATE TABLE IF NOT EXISTS sitemap_state (
+    id INTEGER PRIMARY KEY,
+    dirty_since TIMESTAMP,
+    last_rebuild_at TIMESTAMP
+);
+
+INSERT INTO sitemap_state (id, dirty_since, last_rebuild_at)
+VALUES (1, NULL, NULL)
+ON CONFLICT (id) DO NOTHING;
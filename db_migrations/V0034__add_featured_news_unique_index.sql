@@ -0,0 +1,13 @@
+-- Главная новость может быть только одна: частичный уникальный индекс
+-- позволяет снимать закрепление точечно, без UPDATE всей таблицы news.
+-- Сначала оставляем закреплённой только самую свежую из отмеченных.
+UPDATE news SET is_featured = FALSE
+WHERE is_featured = TRUE
+  AND id <> (
+    SELECT id FROM news
+    WHERE is_featured = TRUE
+    ORDER BY published_at DESC, id DESC
+    LIMIT 1
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_news_featured ON news (is_featured) WHERE is_featured = TRUE;
@@ -0,0 +1,11 @@
+-- Версии данных для инвалидации процессных кэшей функций:
+-- запись в news увеличивает версию, тёплые инстансы сверяют её одним запросом.
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO cache_versions (name, version)
+VALUES ('news', 0)
+ON CONFLICT (name) DO NOTHING;
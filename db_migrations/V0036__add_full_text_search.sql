@@ -0,0 +1,63 @@
+-- Полнотекстовый поиск по новостям, местам и статьям «Город помнит».
+-- Колонки search_vector поддерживаются триггерами (русская морфология),
+-- поиск идёт по GIN-индексам. Веса: заголовок A, анонс/теги B, текст C.
+
+ALTER TABLE news ADD COLUMN IF NOT EXISTS search_vector tsvector;
+ALTER TABLE city_places ADD COLUMN IF NOT EXISTS search_vector tsvector;
+ALTER TABLE memory_articles ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION news_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.excerpt, '')), 'B') ||
+        setweight(to_tsvector('russian', COALESCE(array_to_string(NEW.tags, ' '), '') || ' ' || COALESCE(NEW.keywords, '')), 'B') ||
+        setweight(to_tsvector('russian', regexp_replace(COALESCE(NEW.content, ''), '<[^>]+>', ' ', 'g')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION city_places_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.excerpt, '') || ' ' || COALESCE(NEW.category, '')), 'B') ||
+        setweight(to_tsvector('russian', regexp_replace(COALESCE(NEW.content, ''), '<[^>]+>', ' ', 'g')), 'C') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.address, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION memory_articles_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.excerpt, '') || ' ' || COALESCE(NEW.decade, '')), 'B') ||
+        setweight(to_tsvector('russian', regexp_replace(COALESCE(NEW.content, ''), '<[^>]+>', ' ', 'g')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_news_search_vector ON news;
+CREATE TRIGGER trg_news_search_vector
+    BEFORE INSERT OR UPDATE OF title, excerpt, content, tags, keywords ON news
+    FOR EACH ROW EXECUTE FUNCTION news_search_vector_update();
+
+DROP TRIGGER IF EXISTS trg_city_places_search_vector ON city_places;
+CREATE TRIGGER trg_city_places_search_vector
+    BEFORE INSERT OR UPDATE OF title, excerpt, content, category, address ON city_places
+    FOR EACH ROW EXECUTE FUNCTION city_places_search_vector_update();
+
+DROP TRIGGER IF EXISTS trg_memory_articles_search_vector ON memory_articles;
+CREATE TRIGGER trg_memory_articles_search_vector
+    BEFORE INSERT OR UPDATE OF title, excerpt, content, decade ON memory_articles
+    FOR EACH ROW EXECUTE FUNCTION memory_articles_search_vector_update();
+
+-- Заполняем векторы для уже существующих записей (срабатывают триггеры выше)
+UPDATE news SET title = title;
+UPDATE city_places SET title = title;
+UPDATE memory_articles SET title = title;
+
+CREATE INDEX IF NOT EXISTS idx_news_search_vector ON news USING gin(search_vector);
+CREATE INDEX IF NOT EXISTS idx_city_places_search_vector ON city_places USING gin(search_vector);
+CREATE INDEX IF NOT EXISTS idx_memory_articles_search_vector ON memory_articles USING gin(search_vector);
@@ -0,0 +1,3 @@
+-- Индекс для дельта-синхронизации (GET /news?changed_since=...):
+-- выборка изменённых строк по (updated_at, id) без полного прохода по news.
+CREATE INDEX IF NOT EXISTS idx_news_updated_at ON news (updated_at, id);
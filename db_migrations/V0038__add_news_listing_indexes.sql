@@ -0,0 +1,23 @@
+-- Индексы под формы запросов лент в backend/news:
+-- фильтр по status + category / is_svo / is_showbiz, сортировка published_at DESC, id DESC.
+-- С ними постраничная выдача читает только нужные строки в порядке индекса,
+-- без последовательного сканирования news и сортировки.
+
+-- Основная лента и выборки по статусу (черновики, удалённые в админке)
+CREATE INDEX IF NOT EXISTS idx_news_status_published_at
+    ON news (status, published_at DESC, id DESC);
+
+-- Лента рубрики
+CREATE INDEX IF NOT EXISTS idx_news_category_published_at
+    ON news (category, published_at DESC, id DESC)
+    WHERE status = 'published';
+
+-- Раздел СВО
+CREATE INDEX IF NOT EXISTS idx_news_svo_published_at
+    ON news (published_at DESC, id DESC)
+    WHERE status = 'published' AND is_svo = TRUE;
+
+-- Раздел «Шоубизнес»
+CREATE INDEX IF NOT EXISTS idx_news_showbiz_published_at
+    ON news (published_at DESC, id DESC)
+    WHERE status = 'published' AND is_showbiz = TRUE;
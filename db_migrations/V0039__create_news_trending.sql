@@ -0,0 +1,24 @@
+-- Материализованный рейтинг «В тренде».
+-- Планировщик раз в запуск затухает накопленные очки (экспоненциально, с периодом полураспада)
+-- и добавляет к ним только приросты просмотров, лайков и комментариев с прошлого запуска.
+-- GET /news?sort=trending читает верх этой таблицы по индексу, не сканируя news и comments.
+CREATE TABLE IF NOT EXISTS news_trending (
+    news_id INTEGER PRIMARY KEY,
+    score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    seen_views INTEGER NOT NULL DEFAULT 0,
+    seen_likes INTEGER NOT NULL DEFAULT 0,
+    scored_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_news_trending_score ON news_trending (score DESC, news_id DESC);
+
+-- Водяной знак комментариев: учтены все комментарии с id <= last_comment_id
+CREATE TABLE IF NOT EXISTS trending_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_comment_id INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+INSERT INTO trending_state (id, last_comment_id)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
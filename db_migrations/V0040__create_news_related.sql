@@ -0,0 +1,26 @@
+-- Предрасчитанный блок «Читайте также»: топ-N похожих статей для каждой новости
+-- по пересечению тегов и TF-IDF ключевых слов. Таблицу пересчитывает планировщик,
+-- только для новостей, изменённых с прошлого запуска (и тех, в чьих списках они стоят).
+-- GET /news?id=X&related=true читает готовый список по первичному ключу.
+CREATE TABLE IF NOT EXISTS news_related (
+    news_id INTEGER NOT NULL,
+    rank SMALLINT NOT NULL,
+    related_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (news_id, rank)
+);
+
+-- Обратный поиск: в чьих списках стоит изменённая или снятая с публикации новость
+CREATE INDEX IF NOT EXISTS idx_news_related_related_id ON news_related (related_id);
+
+-- Водяной знак по (updated_at, id) последней обработанной новости
+CREATE TABLE IF NOT EXISTS related_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_updated_at TIMESTAMP,
+    last_news_id INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+INSERT INTO related_state (id)
+VALUES (1)
+ON CONFLICT (id) DO NOTHING;
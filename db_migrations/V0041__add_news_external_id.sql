@@ -0,0 +1,7 @@
+-- Внешний идентификатор статьи для массового импорта (архивы, партнёрские ленты).
+-- Повторный импорт с тем же external_id обновляет статью, а не создаёт дубль.
+ALTER TABLE news ADD COLUMN IF NOT EXISTS external_id VARCHAR(255);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_news_external_id
+    ON news (external_id)
+    WHERE external_id IS NOT NULL;
@@ -0,0 +1,89 @@
+-- Счётчики фасетов опубликованных новостей: рубрики, теги, разделы СВО/шоубизнес и общее число.
+-- Поддерживаются триггерами уровня оператора по таблицам переходов: публикация, смена статуса,
+-- рубрики или тегов, удаление меняют только затронутые строки news_facets.
+-- GET /news?facets=true читает таблицу целиком — O(число фасетов), а не O(число новостей).
+CREATE TABLE IF NOT EXISTS news_facets (
+    facet VARCHAR(20) NOT NULL,
+    value VARCHAR(255) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (facet, value)
+);
+
+CREATE OR REPLACE FUNCTION news_facet_keys(category VARCHAR, tags VARCHAR[], is_svo BOOLEAN, is_showbiz BOOLEAN)
+RETURNS TABLE (facet VARCHAR, value VARCHAR) AS $$
+    SELECT 'all'::VARCHAR, 'published'::VARCHAR
+    UNION ALL
+    SELECT 'category', category WHERE COALESCE(category, '') <> ''
+    UNION ALL
+    SELECT DISTINCT 'tag'::VARCHAR, tag FROM unnest(tags) AS tag WHERE COALESCE(tag, '') <> ''
+    UNION ALL
+    SELECT 'section', 'svo' WHERE is_svo
+    UNION ALL
+    SELECT 'section', 'showbiz' WHERE is_showbiz
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION news_facets_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO news_facets (facet, value, count)
+        SELECT f.facet, f.value, COUNT(*)
+        FROM new_rows n, news_facet_keys(n.category, n.tags, n.is_svo, n.is_showbiz) f
+        WHERE n.status = 'published'
+        GROUP BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = news_facets.count + EXCLUDED.count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Массовые обновления счётчиков дают нулевую разницу и ничего не пишут
+        INSERT INTO news_facets (facet, value, count)
+        SELECT facet, value, SUM(delta)
+        FROM (
+            SELECT f.facet, f.value, 1 AS delta
+            FROM new_rows n, news_facet_keys(n.category, n.tags, n.is_svo, n.is_showbiz) f
+            WHERE n.status = 'published'
+            UNION ALL
+            SELECT f.facet, f.value, -1
+            FROM old_rows o, news_facet_keys(o.category, o.tags, o.is_svo, o.is_showbiz) f
+            WHERE o.status = 'published'
+        ) changes
+        GROUP BY facet, value
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (facet, value) DO UPDATE SET count = news_facets.count + EXCLUDED.count;
+    ELSE
+        UPDATE news_facets nf
+        SET count = nf.count - removed.count
+        FROM (
+            SELECT f.facet, f.value, COUNT(*) AS count
+            FROM old_rows o, news_facet_keys(o.category, o.tags, o.is_svo, o.is_showbiz) f
+            WHERE o.status = 'published'
+            GROUP BY f.facet, f.value
+        ) removed
+        WHERE nf.facet = removed.facet AND nf.value = removed.value;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_news_facets_insert ON news;
+CREATE TRIGGER trg_news_facets_insert
+    AFTER INSERT ON news
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION news_facets_apply();
+
+DROP TRIGGER IF EXISTS trg_news_facets_update ON news;
+CREATE TRIGGER trg_news_facets_update
+    AFTER UPDATE ON news
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION news_facets_apply();
+
+DROP TRIGGER IF EXISTS trg_news_facets_delete ON news;
+CREATE TRIGGER trg_news_facets_delete
+    AFTER DELETE ON news
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION news_facets_apply();
+
+-- Начальное заполнение по текущим данным
+TRUNCATE news_facets;
+INSERT INTO news_facets (facet, value, count)
+SELECT f.facet, f.value, COUNT(*)
+FROM news n, news_facet_keys(n.category, n.tags, n.is_svo, n.is_showbiz) f
+WHERE n.status = 'published'
+GROUP BY f.facet, f.value;
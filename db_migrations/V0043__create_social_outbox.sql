@@ -0,0 +1,52 @@
+-- Очередь публикаций в соцсети (outbox): одна строка на пару (новость, сеть).
+-- POST в social-publisher только ставит задания в очередь; воркер разбирает их
+-- с экспоненциальной задержкой между попытками и с учётом лимитов VK и Telegram.
+-- idempotency_key не даёт повторному нажатию или повторной отправке запроса создать второй пост.
+CREATE TABLE IF NOT EXISTS social_outbox (
+    id SERIAL PRIMARY KEY,
+    news_id INTEGER,
+    network VARCHAR(20) NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL UNIQUE,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP,
+    external_id VARCHAR(64),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Выборка готовых к отправке заданий (и зависших в processing) идёт по этому индексу
+CREATE INDEX IF NOT EXISTS idx_social_outbox_due
+    ON social_outbox (next_attempt_at, id)
+    WHERE status IN ('pending', 'processing');
+
+CREATE INDEX IF NOT EXISTS idx_social_outbox_news ON social_outbox (news_id);
+
+-- Журнал попыток: по строке на каждый вызов API соцсети
+CREATE TABLE IF NOT EXISTS social_outbox_attempts (
+    id SERIAL PRIMARY KEY,
+    outbox_id INTEGER NOT NULL REFERENCES social_outbox(id) ON DELETE CASCADE,
+    attempt INTEGER NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    success BOOLEAN NOT NULL,
+    error TEXT,
+    error_code INTEGER,
+    retry_after INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_social_outbox_attempts_outbox ON social_outbox_attempts (outbox_id, attempt);
+
+-- Ближайшее разрешённое время следующего запроса к сети, общее для всех воркеров
+CREATE TABLE IF NOT EXISTS social_rate_limits (
+    network VARCHAR(20) PRIMARY KEY,
+    next_allowed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO social_rate_limits (network)
+VALUES ('vk'), ('telegram')
+ON CONFLICT (network) DO NOTHING;
@@ -0,0 +1,11 @@
+-- Идентификаторы уже загруженных в соцсети изображений по хешу содержимого:
+-- вложение photo<owner>_<id> для VK (target = id группы) и file_id для Telegram (target = канал).
+-- Повторная публикация той же картинки (черновик, затем пост; повтор из очереди) не загружает её заново.
+CREATE TABLE IF NOT EXISTS social_media_ids (
+    content_hash CHAR(64) NOT NULL,
+    network VARCHAR(20) NOT NULL,
+    target VARCHAR(64) NOT NULL,
+    media_id VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, network, target)
+);
@@ -0,0 +1,44 @@
+-- Лента по тегу в порядке индекса. GIN-индекс по news.tags находит строки с тегом,
+-- но не отдаёт их по (published_at DESC, id DESC), поэтому редкий тег давал
+-- Bitmap Heap Scan + Sort, а частый — проход по всей ленте с фильтром.
+-- news_tags хранит пару (тег, новость) со статусом и датой публикации;
+-- индекс по ним читает страницу ленты тега без сортировки.
+CREATE TABLE IF NOT EXISTS news_tags (
+    news_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    status VARCHAR(20),
+    published_at TIMESTAMP,
+    PRIMARY KEY (news_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_news_tags_feed
+    ON news_tags (tag, status, published_at DESC, news_id DESC);
+
+-- Строки пересобираются только при изменении тегов, статуса или даты публикации
+-- (сброс счётчиков просмотров и лайков триггер не трогает)
+CREATE OR REPLACE FUNCTION news_tags_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM news_tags WHERE news_id = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO news_tags (news_id, tag, status, published_at)
+        SELECT DISTINCT NEW.id, tag, NEW.status, NEW.published_at
+        FROM unnest(NEW.tags) AS tag
+        WHERE COALESCE(tag, '') <> '';
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_news_tags_sync ON news;
+CREATE TRIGGER trg_news_tags_sync
+    AFTER INSERT OR DELETE OR UPDATE OF tags, status, published_at ON news
+    FOR EACH ROW EXECUTE FUNCTION news_tags_sync();
+
+-- Начальное заполнение по текущим данным
+TRUNCATE news_tags;
+INSERT INTO news_tags (news_id, tag, status, published_at)
+SELECT DISTINCT n.id, tag, n.status, n.published_at
+FROM news n, unnest(n.tags) AS tag
+WHERE COALESCE(tag, '') <> '';
@@ -0,0 +1,10 @@
+-- Курсорная пагинация идёт по (published_at, id): строка с NULL в published_at
+-- не попадала под условие (published_at, id) < (...) и пропадала из ленты,
+-- а последняя такая строка страницы ломала сборку курсора.
+-- Пустые даты берём из created_at и запрещаем NULL (значение по умолчанию остаётся).
+UPDATE news
+SET published_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+WHERE published_at IS NULL;
+
+ALTER TABLE news ALTER COLUMN published_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE news ALTER COLUMN published_at SET NOT NULL;
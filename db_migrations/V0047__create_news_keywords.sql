@@ -0,0 +1,43 @@
+-- Словоформы ключевых слов для блока «Читайте также». Планировщик раньше читал
+-- все опубликованные новости за год на каждом запуске, чтобы посчитать IDF и
+-- найти кандидатов. news_keywords хранит слова (строчными, от 3 символов —
+-- как WORD в related.py) с числом вхождений, статусом и датой публикации:
+-- кандидаты по слову берутся из индекса, документная частота считается по нему же.
+CREATE TABLE IF NOT EXISTS news_keywords (
+    news_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    status VARCHAR(20),
+    published_at TIMESTAMP,
+    PRIMARY KEY (news_id, term)
+);
+
+CREATE INDEX IF NOT EXISTS idx_news_keywords_postings
+    ON news_keywords (term, status, published_at DESC, news_id DESC);
+
+CREATE OR REPLACE FUNCTION news_keywords_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM news_keywords WHERE news_id = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO news_keywords (news_id, term, count, status, published_at)
+        SELECT NEW.id, word[1], COUNT(*), NEW.status, NEW.published_at
+        FROM regexp_matches(lower(COALESCE(NEW.keywords, '')), '\w{3,}', 'g') AS word
+        GROUP BY word[1];
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_news_keywords_sync ON news;
+CREATE TRIGGER trg_news_keywords_sync
+    AFTER INSERT OR DELETE OR UPDATE OF keywords, status, published_at ON news
+    FOR EACH ROW EXECUTE FUNCTION news_keywords_sync();
+
+-- Начальное заполнение по текущим данным
+TRUNCATE news_keywords;
+INSERT INTO news_keywords (news_id, term, count, status, published_at)
+SELECT n.id, word[1], COUNT(*), n.status, n.published_at
+FROM news n, regexp_matches(lower(COALESCE(n.keywords, '')), '\w{3,}', 'g') AS word
+GROUP BY n.id, word[1];
@@ -0,0 +1,67 @@
+-- Значение фасета — без ограничения длины: тег длиннее 255 символов ронял
+-- триггер и вместе с ним INSERT/UPDATE новости.
+ALTER TABLE news_facets ALTER COLUMN value TYPE TEXT;
+
+DROP FUNCTION IF EXISTS news_facet_keys(VARCHAR, VARCHAR[], BOOLEAN, BOOLEAN);
+CREATE FUNCTION news_facet_keys(category VARCHAR, tags VARCHAR[], is_svo BOOLEAN, is_showbiz BOOLEAN)
+RETURNS TABLE (facet VARCHAR, value TEXT) AS $$
+    SELECT 'all'::VARCHAR, 'published'::TEXT
+    UNION ALL
+    SELECT 'category', category WHERE COALESCE(category, '') <> ''
+    UNION ALL
+    SELECT DISTINCT 'tag'::VARCHAR, tag FROM unnest(tags) AS tag WHERE COALESCE(tag, '') <> ''
+    UNION ALL
+    SELECT 'section', 'svo' WHERE is_svo
+    UNION ALL
+    SELECT 'section', 'showbiz' WHERE is_showbiz
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Триггер с таблицами переходов нельзя ограничить списком колонок (UPDATE OF ...),
+-- поэтому UPDATE сначала сравнивает наборы (status, category, tags, is_svo, is_showbiz)
+-- до и после: при свёртке счётчиков или правке текста они совпадают, и разница
+-- фасетов не считается вовсе. EXCEPT ALL хешируется и обходится без соединения строк.
+CREATE OR REPLACE FUNCTION news_facets_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO news_facets (facet, value, count)
+        SELECT f.facet, f.value, COUNT(*)
+        FROM new_rows n, news_facet_keys(n.category, n.tags, n.is_svo, n.is_showbiz) f
+        WHERE n.status = 'published'
+        GROUP BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = news_facets.count + EXCLUDED.count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF NOT EXISTS (
+            SELECT status, category, tags, is_svo, is_showbiz FROM new_rows
+            EXCEPT ALL
+            SELECT status, category, tags, is_svo, is_showbiz FROM old_rows
+        ) THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO news_facets (facet, value, count)
+        SELECT facet, value, SUM(delta)
+        FROM (
+            SELECT f.facet, f.value, 1 AS delta
+            FROM new_rows n, news_facet_keys(n.category, n.tags, n.is_svo, n.is_showbiz) f
+            WHERE n.status = 'published'
+            UNION ALL
+            SELECT f.facet, f.value, -1
+            FROM old_rows o, news_facet_keys(o.category, o.tags, o.is_svo, o.is_showbiz) f
+            WHERE o.status = 'published'
+        ) changes
+        GROUP BY facet, value
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (facet, value) DO UPDATE SET count = news_facets.count + EXCLUDED.count;
+    ELSE
+        UPDATE news_facets nf
+        SET count = nf.count - removed.count
+        FROM (
+            SELECT f.facet, f.value, COUNT(*) AS count
+            FROM old_rows o, news_facet_keys(o.category, o.tags, o.is_svo, o.is_showbiz) f
+            WHERE o.status = 'published'
+            GROUP BY f.facet, f.value
+        ) removed
+        WHERE nf.facet = removed.facet AND nf.value = removed.value;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,5 @@
+-- Кандидаты «Читайте также» по тегу: схожесть сравнивает теги без учёта
+-- регистра, поэтому и постинги ищутся по lower(tag) — «Город» и «город»
+-- дают одних и тех же кандидатов. Индекс отдаёт свежие постинги без сортировки.
+CREATE INDEX IF NOT EXISTS idx_news_tags_lower
+    ON news_tags (lower(tag), status, published_at DESC, news_id DESC);
@@ -271,6 +271,7 @@ export const useAdminState = () => {
                 excerpt: newsForm.content,
                 image_url: newsForm.image_url,
                 news_url: newsUrl,
+                news_id: data.id,
                 publish_vk: false,
                 publish_telegram: true,
                 keywords: newsForm.keywords || ''
@@ -279,7 +280,11 @@ export const useAdminState = () => {
             
             const socialData = await socialResponse.json();
             
-            if (socialData.published_count > 0) {
+            if (socialData.queued_count > 0) {
+              fetch(`${FUNCTIONS_URL.socialPublisher}?action=drain`, { method: 'POST', keepalive: true }).catch(() => {});
+            }
+            
+            if (socialData.published_count > 0 || socialData.queued_count > 0) {
               toast({
                 title: 'Успешно!',
                 description: 'Новость опубликована и отправлена в Telegram'
@@ -1090,6 +1095,7 @@ export const useAdminState = () => {
           excerpt: news.content,
           image_url: news.image_url,
           news_url: newsUrl,
+          news_id: news.id,
           publish_vk: false,
           publish_telegram: true
         })
@@ -1097,11 +1103,25 @@ export const useAdminState = () => {
       
       const data = await response.json();
       
-      if (data.published_count > 0) {
+      if (data.queued_count > 0 || data.already_queued?.length > 0) {
+        fetch(`${FUNCTIONS_URL.socialPublisher}?action=drain`, { method: 'POST', keepalive: true }).catch(() => {});
+      }
+      
+      if (data.published_count > 0 || data.queued_count > 0) {
         toast({
           title: 'Успешно!',
           description: 'Новость отправлена в Telegram'
         });
+      } else if (data.already_sent?.includes('telegram')) {
+        toast({
+          title: 'Уже опубликовано',
+          description: 'Эта новость уже была отправлена в Telegram, повторная отправка не выполнялась'
+        });
+      } else if (data.already_queued?.includes('telegram')) {
+        toast({
+          title: 'Уже в очереди',
+          description: 'Эта новость уже ожидает отправки в Telegram'
+        });
       } else {
         toast({
           title: 'Ошибка',
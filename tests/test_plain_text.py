@@ -0,0 +1,132 @@
+'''
+html_to_text (backend/social-publisher/plain_text.py) against the chain of
+re.sub passes it replaced.
+
+    python -m pytest tests/test_plain_text.py
+    python tests/test_plain_text.py        # times both implementations
+
+The only intended difference from the old chain: a "<" that does not start a
+tag is kept as text. The reference marks such "<" before running the old
+chain and restores them afterwards, so everything else must match exactly.
+'''
+import html
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'social-publisher'))
+
+import pytest
+
+from plain_text import html_to_text
+
+BARE_LT = re.compile(r'<(?![A-Za-z/!][^<>]*>)')
+
+
+def legacy_clean(text: str) -> str:
+    '''clean_html followed by clean_markdown, as they were (after unescape)'''
+    text = re.sub(r'<img[^>]*>', '', text)
+    text = re.sub(r'<br\s*/?>', '\n', text)
+    text = re.sub(r'<strong>(.*?)</strong>', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'<b>(.*?)</b>', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'<em>(.*?)</em>', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'<i>(.*?)</i>', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'<a[^>]*>(.*?)</a>', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'<li[^>]*>(.*?)</li>', r'• \1\n', text, flags=re.DOTALL)
+    text = re.sub(r'<h[1-6][^>]*>(.*?)</h[1-6]>', r'\1\n\n', text, flags=re.DOTALL)
+    text = re.sub(r'<blockquote[^>]*>(.*?)</blockquote>', r'"\1"\n\n', text, flags=re.DOTALL)
+    text = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', text, flags=re.DOTALL)
+    text = re.sub(r'<ul[^>]*>|</ul>|<ol[^>]*>|</ol>', '\n', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\u00a0|\u202f|\u2009', ' ', text)
+    text = re.sub(r'\u2011|\u2012|\u2013|\u2014|\u2015', '-', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+    text = text.strip()
+    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'[#*_`~]', '', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def legacy_html_to_text(text: str) -> str:
+    '''The old chain, with "<" that does not start a tag protected as text'''
+    return legacy_clean(BARE_LT.sub('\x00', html.unescape(text))).replace('\x00', '<')
+
+
+GOLDEN = [
+    ('<p>Первый абзац.</p><p>Второй&nbsp;абзац — с тире.</p>',
+     'Первый абзац.\n\nВторой абзац - с тире.'),
+    ('<h2>Заголовок</h2><p>Текст <strong>жирный</strong> и <em>курсив</em>.</p>',
+     'Заголовок\n\nТекст жирный и курсив.'),
+    ('<ul><li><p>один</p></li><li><p>два</p></li></ul><p>после</p>',
+     '• один\n\n• два\n\nпосле'),
+    ('<blockquote><p>Цитата мэра</p></blockquote><p>Комментарий</p>',
+     '"Цитата мэра\n\n"\n\nКомментарий'),
+    ('<p>Ссылка: <a target="_blank" rel="noopener noreferrer nofollow" href="https://x.ru">сайт</a><br>новая строка</p>',
+     'Ссылка: сайт\nновая строка'),
+    ('<p>Фото:</p><img src="https://cdn.poehali.dev/a.jpg"><p>Подпись</p>',
+     'Фото:\n\nПодпись'),
+    ('<ol><li>a</li><li>b<li>c</li></ol>',
+     '• a\n• bc'),
+    ('<pre><code>x = 1</code></pre><p>ok</p>',
+     'x = 1ok'),
+    ('**Важно:** см. [карту](https://maps.ru) и ![схема](https://x/y.png)\n\n\n\n# Итог',
+     'Важно: см. карту и \n\n Итог'),
+    ('Обычный текст без разметки,  с  пробелами\u202fи\u2009тонкими.',
+     'Обычный текст без разметки, с пробелами и тонкими.'),
+    # a decoded or literal "<" that opens no tag is text
+    ('<p>5 &lt; 7 и 9 &gt; 3</p>',
+     '5 < 7 и 9 > 3'),
+    ('<p>Если t &lt; 0, то снег</p><p>Дальше</p>',
+     'Если t < 0, то снег\n\nДальше'),
+    ('Цена < 100 руб.<br>Скидка',
+     'Цена < 100 руб.\nСкидка'),
+    # a link whose text is only markup leaves adjacent blank lines behind
+    ('</ol>Да<br/>~[*](u)\n\n\nx',
+     'Да\n\nx'),
+]
+
+
+@pytest.mark.parametrize('source, expected', GOLDEN)
+def test_golden(source, expected):
+    assert html_to_text(source) == expected
+    assert legacy_html_to_text(source) == expected
+
+
+# Tag soup of everything the editor and pasted content produce, with stray
+# and escaped angle brackets
+PIECES = ['<p>', '</p>', '<p class="x">', '<h2>', '</h2>', '<h3>', '</h3>', '<ul>', '</ul>', '<ol>', '</ol>',
+          '<li>', '</li>', '<blockquote>', '</blockquote>', '<strong>', '</strong>', '<em>', '</em>',
+          '<a href="https://x.ru/a_b">', '</a>', '<br>', '<br />', '<br/>', '<img src="y.png">', '<pre>', '</pre>',
+          '<code>', '</code>', '<hr>', '<s>', '</s>', '<!-- c -->', '&nbsp;', '&amp;', '&mdash;', ' ', '  ',
+          '\n', '\n\n\n', '*', '_', '#', '`', '~', '[ссылка](https://x.ru)', '![img](y.png)', '[*](u)',
+          '\u2013', '\u00a0', '<', '>', '&lt;', '&gt;', ' < ', 'Новость', 'города', 'text', 'b', 'p', '/', '.', ',']
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random_input_matches_legacy(seed):
+    rng = random.Random(seed)
+    for _ in range(25000):
+        case = ''.join(rng.choice(PIECES) for _ in range(rng.randint(1, 80)))
+        assert html_to_text(case) == legacy_html_to_text(case), case
+
+
+if __name__ == '__main__':
+    import time
+
+    paragraph = ('<p>Сегодня в городе прошло <strong>заседание</strong> думы, на котором обсудили '
+                 '<a href="https://x.ru/doc">бюджет</a>&nbsp;— депутаты&nbsp;поддержали проект.</p>')
+    block = ('<h2>Подробности</h2>' + paragraph * 8 + '<ul>' + '<li><p>пункт списка</p></li>' * 6 + '</ul>'
+             + '<blockquote><p>Цитата</p></blockquote><img src="https://cdn/x.jpg">')
+    for label, article in (('5 KB', block), ('100 KB', block * 20), ('1 MB', block * 200)):
+        for name, convert in (('legacy', legacy_html_to_text), ('single-pass', html_to_text)):
+            runs = max(1, 200000 // len(article))
+            started = time.perf_counter()
+            for _ in range(runs):
+                convert(article)
+            elapsed = (time.perf_counter() - started) / runs * 1000
+            print(f'{label:>6} {name:<12} {elapsed:8.3f} ms')
+        assert legacy_html_to_text(article) == html_to_text(article)
@@ -0,0 +1,230 @@
+'''
+Query-plan regression check for the news listings.
+
+Seeds temporary copies of news and news_tags (CREATE TEMP TABLE ... LIKE
+... INCLUDING ALL, so they carry the indexes of the migrated schema and
+shadow the real tables for this connection only), builds every listing
+query exactly as fetch_news_page does and fails if a plan reads news or
+news_tags with a Seq Scan or has to Sort. Each query is checked both as
+planned ad hoc and as the generic plan execute_prepared runs it with.
+It also pages through the whole seeded feed with next_cursor and fails
+unless every published row comes back exactly once.
+
+    DATABASE_URL=... python tools/news_plan_check.py
+
+The real tables are not written to; the copies go away with the connection.
+'''
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'news'))
+
+import psycopg2
+
+import index
+from prepared import to_positional
+
+SEED_ROWS = int(os.environ.get('PLAN_CHECK_ROWS', '100000'))
+SCANNED_TABLES = ('news', 'news_tags')
+SORT_NODES = ('Sort', 'Incremental Sort')
+
+
+class Captured(Exception):
+    '''Raised instead of running the query, carries its SQL and parameters'''
+
+
+def capture(cur, query: str, values=(), prepare=True):
+    raise Captured(query, list(values))
+
+
+def seed(cur):
+    cur.execute('CREATE TEMP TABLE news (LIKE news INCLUDING ALL)')
+    cur.execute('CREATE TEMP TABLE news_tags (LIKE news_tags INCLUDING ALL)')
+    # 96% published, a few drafts and deleted rows; one common tag (1/8), one
+    # rare tag (1/200) and a long tail; 10% SVO, 5% showbiz
+    cur.execute(f'''
+        INSERT INTO news (id, title, category, excerpt, content, status, tags,
+                          is_svo, is_showbiz, views, likes, published_at, created_at, updated_at)
+        SELECT i,
+               'Новость ' || i,
+               (ARRAY['Город', 'Политика', 'Спорт', 'Культура', 'Погода', 'Общество', 'Экономика', 'Происшествия'])[i % 8 + 1],
+               'Анонс ' || i,
+               '<p>Текст новости ' || i || '</p>',
+               CASE WHEN i % 100 < 96 THEN 'published' WHEN i % 100 < 99 THEN 'draft' ELSE 'deleted' END,
+               ARRAY_REMOVE(ARRAY[
+                   CASE WHEN i % 8 = 0 THEN 'город' END,
+                   CASE WHEN i % 200 = 0 THEN 'архив' END,
+                   'тег' || (i % 500)
+               ], NULL)::varchar[],
+               i % 10 = 0,
+               i % 20 = 1,
+               i % 1000,
+               i % 50,
+               TIMESTAMP '2020-01-01' + make_interval(mins => i * 10),
+               TIMESTAMP '2020-01-01' + make_interval(mins => i * 10),
+               TIMESTAMP '2020-01-01' + make_interval(mins => i * 10)
+        FROM generate_series(1, {int(SEED_ROWS)}) AS i
+    ''')
+    cur.execute('''
+        INSERT INTO news_tags (news_id, tag, status, published_at)
+        SELECT DISTINCT n.id, tag, n.status, n.published_at
+        FROM news n, unnest(n.tags) AS tag
+    ''')
+    # Autovacuum never visits temporary tables; vacuum them so the visibility
+    # map looks like a live table's and index-only scans are costed as such
+    cur.execute('VACUUM ANALYZE news')
+    cur.execute('VACUUM ANALYZE news_tags')
+
+
+def listing_query(cur, **kwargs) -> Tuple[str, List[Any]]:
+    '''SQL and parameters fetch_news_page would execute for these arguments'''
+    arguments: Dict[str, Any] = {
+        'status': 'published', 'is_svo': False, 'is_showbiz': False, 'tag': None,
+        'category': None, 'cursor': None, 'limit': None, 'paginate': True, 'columns': None
+    }
+    arguments.update(kwargs)
+    execute = index.execute_prepared
+    index.execute_prepared = capture
+    try:
+        index.fetch_news_page(cur, **arguments)
+    except Captured as e:
+        return e.args[0], e.args[1]
+    finally:
+        index.execute_prepared = execute
+    raise AssertionError('fetch_news_page did not run a query')
+
+
+def plan_nodes(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def plan_problems(plan: Dict[str, Any]) -> List[str]:
+    problems = []
+    for node in plan_nodes(plan):
+        node_type = node['Node Type']
+        if node_type == 'Seq Scan' and node.get('Relation Name') in SCANNED_TABLES:
+            problems.append(f"Seq Scan on {node['Relation Name']}")
+        elif node_type in SORT_NODES:
+            problems.append(f"{node_type} by {', '.join(node.get('Sort Key', []))}")
+    return problems
+
+
+def explain(cur, query: str, values: List[Any], generic: bool) -> Dict[str, Any]:
+    if not generic:
+        cur.execute('EXPLAIN (FORMAT JSON) ' + query, values)
+        return cur.fetchone()[0][0]['Plan']
+    cur.execute('SET plan_cache_mode = force_generic_plan')
+    cur.execute(f'PREPARE plan_check AS {to_positional(query)}')
+    try:
+        if values:
+            cur.execute(f'EXPLAIN (FORMAT JSON) EXECUTE plan_check ({", ".join(["%s"] * len(values))})', values)
+        else:
+            cur.execute('EXPLAIN (FORMAT JSON) EXECUTE plan_check')
+        return cur.fetchone()[0][0]['Plan']
+    finally:
+        cur.execute('DEALLOCATE plan_check')
+        cur.execute('RESET plan_cache_mode')
+
+
+def cursor_after(cur, rows: int, alias_filter: str = "status = 'published'", tag: Optional[str] = None) -> str:
+    '''Cursor token pointing into the middle of a seeded feed'''
+    if tag:
+        cur.execute('''
+            SELECT published_at, news_id FROM news_tags
+            WHERE tag = %s AND status = 'published'
+            ORDER BY published_at DESC, news_id DESC
+            OFFSET %s LIMIT 1
+        ''', (tag, rows))
+    else:
+        cur.execute(f'''
+            SELECT published_at, id FROM news
+            WHERE {alias_filter}
+            ORDER BY published_at DESC, id DESC
+            OFFSET %s LIMIT 1
+        ''', (rows,))
+    return index.encode_cursor(*cur.fetchone())
+
+
+def cursor_walk_problems(cur) -> List[str]:
+    '''
+    Page through the feed with next_cursor: every published row exactly once.
+    A NULL published_at would drop out of the (published_at, id) keyset, so the
+    column must refuse it.
+    '''
+    problems = []
+    try:
+        cur.execute('''
+            INSERT INTO news (id, title, category, excerpt, status, published_at)
+            VALUES (0, 'Без даты', 'Город', 'Анонс', 'published', NULL)
+        ''')
+        problems.append('news.published_at accepts NULL')
+    except psycopg2.errors.NotNullViolation:
+        pass
+
+    seen: List[int] = []
+    cursor = None
+    while True:
+        items, cursor = index.fetch_news_page(cur, 'published', False, False, None, None,
+                                              cursor, str(index.NEWS_PAGE_MAX), True, ['id'])
+        seen.extend(item['id'] for item in items)
+        if cursor is None:
+            break
+    cur.execute("SELECT id FROM news WHERE status = 'published' ORDER BY published_at DESC, id DESC")
+    expected = [row[0] for row in cur.fetchall()]
+    if seen != expected:
+        problems.append(f'cursor walk returned {len(seen)} rows ({len(set(seen))} distinct), expected {len(expected)}')
+    return problems
+
+
+def main() -> int:
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    conn.autocommit = True
+    failures = 0
+
+    with conn.cursor() as cur:
+        seed(cur)
+        shapes = [
+            ('feed', {}),
+            ('feed, next page', {'cursor': cursor_after(cur, 500)}),
+            ('feed, card fields', {'columns': index.FIELD_PROFILES['card']}),
+            ('drafts', {'status': 'draft'}),
+            ('deleted', {'status': 'deleted'}),
+            ('category', {'category': 'Спорт'}),
+            ('category, next page', {'category': 'Спорт',
+                                     'cursor': cursor_after(cur, 500, "status = 'published' AND category = 'Спорт'")}),
+            ('common tag', {'tag': 'город'}),
+            ('rare tag', {'tag': 'архив'}),
+            ('tag, next page', {'tag': 'город', 'cursor': cursor_after(cur, 500, tag='город')}),
+            ('svo', {'is_svo': True}),
+            ('showbiz', {'is_showbiz': True}),
+            ('legacy feed', {'paginate': False}),
+            ('legacy category', {'paginate': False, 'category': 'Спорт'}),
+            ('legacy tag', {'paginate': False, 'tag': 'город'}),
+            ('legacy drafts', {'paginate': False, 'status': 'draft'}),
+            ('legacy svo', {'paginate': False, 'is_svo': True})
+        ]
+        print(f'seeded {SEED_ROWS} news rows')
+        for label, arguments in shapes:
+            query, values = listing_query(cur, **arguments)
+            for generic in (False, True):
+                plan = explain(cur, query, values, generic)
+                problems = plan_problems(plan)
+                failures += bool(problems)
+                scans = sorted({node['Index Name'] for node in plan_nodes(plan) if 'Index Name' in node})
+                status = 'FAIL ' + '; '.join(problems) if problems else 'ok'
+                print(f"{label:<22} {'generic' if generic else 'custom ':<7} {status:<40} {', '.join(scans)}")
+
+        problems = cursor_walk_problems(cur)
+        failures += len(problems)
+        print(f"{'cursor walk':<30} {'FAIL ' + '; '.join(problems) if problems else 'ok'}")
+
+    conn.close()
+    print('all listing plans use their indexes, paging is complete' if not failures else f'{failures} check(s) failed')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+'''
+Plan+execute time of the news listing queries, ad hoc vs prepared
+(backend/news/prepared.py), on the temporary 100k-row copy of news and
+news_tags that news_plan_check.py seeds (PLAN_CHECK_ROWS to change).
+
+Page sizes rotate on every run: LIMIT is a parameter, so each listing still
+needs exactly one prepared statement.
+
+    DATABASE_URL=... python tools/news_prepared_benchmark.py
+
+The real tables are not written to; the copies go away with the connection.
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'news'))
+
+import prepared
+from db_pool import get_connection
+from news_plan_check import SEED_ROWS, listing_query, seed
+
+PAGE_SIZES = ('10', '20', '50', '100')
+LISTINGS = (
+    ('feed', {}),
+    ('category', {'category': 'Спорт'}),
+    ('tag', {'tag': 'город'}),
+    ('svo', {'is_svo': True}),
+    ('showbiz', {'is_showbiz': True})
+)
+
+
+def main():
+    conn = get_connection(os.environ['DATABASE_URL'])
+    conn.autocommit = True
+    runs = int(os.environ.get('BENCH_RUNS', '500'))
+
+    with conn.cursor() as cur:
+        seed(cur)
+        print(f'seeded {SEED_ROWS} news rows, runs per query: {runs}')
+        for label, arguments in LISTINGS:
+            pages = [listing_query(cur, limit=size, **arguments) for size in PAGE_SIZES]
+            assert len({query for query, _ in pages}) == 1
+            timings = {}
+            for mode in ('ad hoc', 'prepared'):
+                prepared.PREPARED_STATEMENTS = mode == 'prepared'
+                for query, values in pages * 3:
+                    prepared.execute_prepared(cur, query, values)
+                    cur.fetchall()
+                started = time.perf_counter()
+                for run in range(runs):
+                    query, values = pages[run % len(pages)]
+                    prepared.execute_prepared(cur, query, values)
+                    cur.fetchall()
+                timings[mode] = (time.perf_counter() - started) / runs * 1000
+            print(f'{label:<9} ad hoc {timings["ad hoc"]:6.3f} ms   prepared {timings["prepared"]:6.3f} ms')
+        cur.execute('SELECT name, generic_plans, custom_plans FROM pg_prepared_statements')
+        statements = cur.fetchall()
+        for name, generic, custom in statements:
+            print(f'{name}: generic plans {generic}, custom plans {custom}')
+        print(f'{len(statements)} prepared statements for {len(PAGE_SIZES)} page sizes')
+    conn.close_physically()
+
+
+if __name__ == '__main__':
+    main()